@@ -1,22 +1,69 @@
+import hashlib
+import logging
+import time
+from threading import Lock
+from functools import lru_cache
+from cachetools import TTLCache
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from core.config import get_settings
 from core.database import get_db
 from models.models import Restaurant
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger("auth")
 security = HTTPBearer()
 
+# Decoded JWT payloads keyed by sha256(token); bounded so token churn can't grow memory
+_JWT_CACHE = TTLCache(maxsize=10_000, ttl=300)
+_JWT_LOCK = Lock()
+
+# Restaurant column values keyed by id; rebuilt into a session-bound
+# instance per request so lazy relationships (tables, products) still load.
+# No route updates or deletes restaurants today, so entries are only ever
+# dropped by the 60s TTL - a row changed directly in the DB can be served
+# stale for up to a minute. A future profile/password/delete route must
+# pop its id from this cache (under _RESTAURANT_LOCK) after committing
+_RESTAURANT_CACHE = TTLCache(maxsize=10_000, ttl=60)
+_RESTAURANT_LOCK = Lock()
+_RESTAURANT_COLUMNS = tuple(c.key for c in Restaurant.__table__.columns)
+
+@lru_cache()
+def get_pwd_context() -> CryptContext:
+    """Build the bcrypt context on first use instead of at import"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        # Hashes at any other cost (passlib's default 12, from before
+        # BCRYPT_ROUNDS existed) are flagged for update, so login migrates
+        # them and known and unknown emails end up paying the same KDF
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+@lru_cache()
+def get_dummy_password_hash() -> str:
+    """
+    Hash checked when a login email is unknown, so every login pays one KDF
+    Built at the configured cost; warmed in lifespan startup so the first
+    unknown-email login doesn't pay a second KDF
+    """
+    return get_password_hash("garsonai-timing-dummy")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """verify_password that also returns a fresh hash when the stored one uses another cost"""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -29,24 +76,56 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 def decode_token(token: str):
+    key = hashlib.sha256(token.encode()).digest()
+    with _JWT_LOCK:
+        payload = _JWT_CACHE.get(key)
+    if payload is not None:
+        # Cached entries may outlive the token itself
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return payload
+        with _JWT_LOCK:
+            _JWT_CACHE.pop(key, None)
+        return None
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        print(f"✓ Token decoded successfully: {payload}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Token decoded successfully: %s", payload)
+        with _JWT_LOCK:
+            _JWT_CACHE[key] = payload
         return payload
     except JWTError as e:
-        print(f"✗ JWT decode error: {e}")
+        logger.debug("JWT decode error: %s", e)
         return None
 
+def _load_restaurant(db: Session, restaurant_id: int):
+    with _RESTAURANT_LOCK:
+        row = _RESTAURANT_CACHE.get(restaurant_id)
+    if row is not None:
+        restaurant = Restaurant(**row)
+        make_transient_to_detached(restaurant)
+        # load=False attaches the cached state without a SELECT
+        return db.merge(restaurant, load=False)
+    
+    restaurant = db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
+    if restaurant is not None:
+        row = {key: getattr(restaurant, key) for key in _RESTAURANT_COLUMNS}
+        with _RESTAURANT_LOCK:
+            _RESTAURANT_CACHE[restaurant_id] = row
+    return restaurant
+
 async def get_current_restaurant(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> Restaurant:
     token = credentials.credentials
-    print(f"Received token: {token[:50]}...")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received token: %s...", token[:50])
     payload = decode_token(token)
     
     if payload is None:
-        print("✗ Token payload is None")
+        logger.debug("Token payload is None")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
@@ -60,20 +139,20 @@ async def get_current_restaurant(
         )
     
     restaurant_id: int = int(restaurant_id_str)
-    print(f"Restaurant ID from token: {restaurant_id}")
+    logger.debug("Restaurant ID from token: %s", restaurant_id)
     if restaurant_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
     
-    restaurant = db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
+    restaurant = _load_restaurant(db, restaurant_id)
     if restaurant is None:
-        print(f"✗ Restaurant not found with ID: {restaurant_id}")
+        logger.debug("Restaurant not found with ID: %s", restaurant_id)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Restaurant not found"
         )
     
-    print(f"✓ Restaurant authenticated: {restaurant.name}")
+    logger.debug("Restaurant authenticated: %s", restaurant.name)
     return restaurant
@@ -0,0 +1,74 @@
+"""
+In-process caches for hot public read paths
+Entries carry a short TTL so multi-worker deployments converge even though
+invalidation only reaches the worker that handled the write
+"""
+import hashlib
+from threading import Lock
+from typing import Dict, Optional, Set, Tuple
+from cachetools import TTLCache
+
+MENU_CACHE_TTL = 60  # seconds
+
+# qr_token -> (etag, serialized JSON body)
+_menu_responses = TTLCache(maxsize=4096, ttl=MENU_CACHE_TTL)
+# restaurant_id -> qr_tokens whose menu is cached (for invalidation)
+_menu_tokens: Dict[int, Set[str]] = {}
+# restaurant_id -> LLM menu context string for voice sessions
+_menu_contexts = TTLCache(maxsize=1024, ttl=MENU_CACHE_TTL)
+# qr_token -> (table_id, restaurant_id, table_number); primitives, not ORM
+# rows, so entries never outlive the session that loaded them
+_tables = TTLCache(maxsize=10_000, ttl=MENU_CACHE_TTL)
+_lock = Lock()
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def get_menu_response(qr_token: str) -> Optional[Tuple[str, bytes]]:
+    with _lock:
+        return _menu_responses.get(qr_token)
+
+
+def set_menu_response(qr_token: str, restaurant_id: int, body: bytes) -> Tuple[str, bytes]:
+    entry = (make_etag(body), body)
+    with _lock:
+        _menu_responses[qr_token] = entry
+        _menu_tokens.setdefault(restaurant_id, set()).add(qr_token)
+    return entry
+
+
+def get_menu_context(restaurant_id: int) -> Optional[str]:
+    with _lock:
+        return _menu_contexts.get(restaurant_id)
+
+
+def set_menu_context(restaurant_id: int, menu_context: str) -> None:
+    with _lock:
+        _menu_contexts[restaurant_id] = menu_context
+
+
+def invalidate_menu(restaurant_id: int) -> None:
+    """Drop every cached menu of a restaurant (after product changes)"""
+    with _lock:
+        for qr_token in _menu_tokens.pop(restaurant_id, ()):
+            _menu_responses.pop(qr_token, None)
+        _menu_contexts.pop(restaurant_id, None)
+
+
+def get_table(qr_token: str) -> Optional[Tuple[int, int, int]]:
+    with _lock:
+        return _tables.get(qr_token)
+
+
+def set_table(qr_token: str, table: Tuple[int, int, int]) -> None:
+    with _lock:
+        _tables[qr_token] = table
+
+
+def invalidate_table(qr_token: str) -> None:
+    """Drop a table's cached lookup and menu (after it is deleted)"""
+    with _lock:
+        _menu_responses.pop(qr_token, None)
+        _tables.pop(qr_token, None)
@@ -10,6 +10,18 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 5256000  # ~10 years (practically no expiry)
     
+    # bcrypt cost for new password hashes (existing hashes keep their own cost)
+    BCRYPT_ROUNDS: int = 10
+    
+    # Run Base.metadata.create_all at startup (disable when schema is managed externally)
+    AUTO_CREATE_TABLES: bool = True
+    
+    # Root log level (DEBUG enables per-request auth tracing)
+    LOG_LEVEL: str = "WARNING"
+    
+    # Make every un-eager-loaded relationship access raise (dev/CI N+1 guard)
+    STRICT_ORM_LOADING: bool = False
+    
     class Config:
         env_file = ".env"
 
@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, raiseload
 from .config import get_settings
 
 settings = get_settings()
@@ -10,6 +10,19 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+if settings.STRICT_ORM_LOADING:
+    @event.listens_for(SessionLocal, "do_orm_execute")
+    def _raise_on_lazy_load(orm_execute_state):
+        # Top-level ORM selects get raiseload('*'): relationships a query
+        # doesn't load explicitly (joinedload/selectinload) raise on access
+        # instead of silently issuing one query per object
+        if (
+            orm_execute_state.is_select
+            and not orm_execute_state.is_relationship_load
+            and not orm_execute_state.is_column_load
+        ):
+            orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*"))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -44,16 +44,25 @@ def get_fal_client():
 @lru_cache(maxsize=1)
 def get_async_http_client():
     """
-    Get singleton async httpx client for downloading TTS audio
+    Get singleton async httpx client shared by STT/TTS
+    HTTP/2 multiplexes concurrent sessions over one TLS connection
     """
-    return httpx.AsyncClient(
-        timeout=30.0,
+    # Limits/http2 must live on the transport: a custom transport
+    # replaces the one AsyncClient would build from its own kwargs
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
         limits=httpx.Limits(
-            max_connections=10,
-            max_keepalive_connections=5,
-            keepalive_expiry=30.0
+            max_connections=100,
+            max_keepalive_connections=50,
+            keepalive_expiry=60.0
         )
     )
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(30.0, connect=2.0),
+        transport=transport
+    )
 
 
 # Pre-initialize to avoid cold start on first request
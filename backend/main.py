@@ -1,14 +1,30 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from routers import  voice_routes, auth_routes, restaurant_routes, menu_routes
+from core.config import get_settings
 from core.database import engine, Base
+from core.auth import get_dummy_password_hash
 from services.tts_warmer import start_tts_warmer, stop_tts_warmer
 # Note: STT warmer disabled - real requests keep container warm
 # from services.stt_warmer import start_stt_warmer, stop_stt_warmer
 from contextlib import asynccontextmanager
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+settings = get_settings()
+
+# Log records are handed to a queue; a listener thread does the stderr
+# writes, so logging from the voice pipeline never blocks the event loop
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler(), respect_handler_level=True)
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(levelname)s:%(name)s:%(message)s",
+    handlers=[QueueHandler(_log_queue)]
+)
 
 
 @asynccontextmanager
@@ -16,7 +32,19 @@ async def lifespan(app: FastAPI):
     """
     Lifecycle manager for startup/shutdown tasks
     """
-    # Startup: Start warmers
+    # Startup: start the log writer here, paired with stop() at shutdown, so
+    # a second lifespan (reload, TestClient re-entry) restarts it. Records
+    # logged before this wait in the queue
+    _log_listener.start()
+    
+    # Create database tables (dev convenience, off in production)
+    if settings.AUTO_CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+    
+    # Build the login dummy hash now rather than on the first unknown email
+    get_dummy_password_hash()
+    
+    # Start warmers
     print("🚀 Starting TTS warmer...")
     start_tts_warmer(interval=30)  # Keep warm every 30s
     
@@ -30,12 +58,14 @@ async def lifespan(app: FastAPI):
     print("🛑 Stopping warmers...")
     stop_tts_warmer()
     # stop_stt_warmer()
+    _log_listener.stop()
 
 
 app = FastAPI(
     title="GarsonAI API", 
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -47,6 +77,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON payloads (menus, orders) - repeated keys shrink ~5-10x
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 # Include routers
 app.include_router(auth_routes.router)
 app.include_router(restaurant_routes.router)
@@ -65,3 +98,20 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "healthy"}
+
+
+if __name__ == "__main__":
+    # `python main.py`: same app on uvicorn's C-accelerated stack - uvloop
+    # event loop (every WebSocket read/write goes through it), httptools,
+    # websockets
+    import uvicorn
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        ws_ping_interval=20,
+        ws_ping_timeout=20
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -34,6 +34,11 @@ class Table(Base):
     
     restaurant = relationship("Restaurant", back_populates="tables")
     orders = relationship("Order", back_populates="table", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # One table per number within a restaurant; create_table relies on it
+        UniqueConstraint("restaurant_id", "table_number", name="uq_rest_table_num"),
+    )
 
 class Product(Base):
     __tablename__ = "products"
@@ -50,6 +55,11 @@ class Product(Base):
     
     restaurant = relationship("Restaurant", back_populates="products")
     order_items = relationship("OrderItem", back_populates="product")
+    
+    __table_args__ = (
+        # Public menu / voice context: available products of a restaurant
+        Index("ix_products_restaurant_available", "restaurant_id", "is_available"),
+    )
 
 class Order(Base):
     __tablename__ = "orders"
@@ -65,12 +75,20 @@ class Order(Base):
     restaurant = relationship("Restaurant", back_populates="orders")
     table = relationship("Table", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Dashboard order list: newest orders of a restaurant
+        Index("ix_orders_restaurant_created", "restaurant_id", created_at.desc()),
+        # A table's orders by status; also serves the table_id lookup the
+        # delete_table cascade runs
+        Index("ix_orders_table_status", "table_id", "status"),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
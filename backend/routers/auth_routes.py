@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from core.database import get_db
-from core.auth import get_password_hash, verify_password, create_access_token
+from core.auth import get_password_hash, verify_and_update_password, create_access_token, get_dummy_password_hash
 from models.models import Restaurant
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -24,45 +26,63 @@ class TokenResponse(BaseModel):
 
 @router.post("/register", response_model=TokenResponse)
 def register(request: RegisterRequest, db: Session = Depends(get_db)):
-    # Check if email exists
-    existing = db.query(Restaurant).filter(Restaurant.email == request.email).first()
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Create restaurant
+    # Create restaurant; the unique index on email rejects duplicates,
+    # so no separate existence SELECT (which could also race)
     restaurant = Restaurant(
         name=request.name,
         email=request.email,
         hashed_password=get_password_hash(request.password)
     )
     db.add(restaurant)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    restaurant_id = restaurant.id
     db.commit()
-    db.refresh(restaurant)
     
     # Create token
-    access_token = create_access_token({"sub": restaurant.id})
+    access_token = create_access_token({"sub": restaurant_id})
     
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
-        restaurant_id=restaurant.id,
-        restaurant_name=restaurant.name
+        restaurant_id=restaurant_id,
+        restaurant_name=request.name
     )
 
 @router.post("/login", response_model=TokenResponse)
 def login(request: LoginRequest, db: Session = Depends(get_db)):
-    # Find restaurant
-    restaurant = db.query(Restaurant).filter(Restaurant.email == request.email).first()
+    # Find restaurant (unique-index lookup, only the columns login needs)
+    restaurant = db.query(
+        Restaurant.id, Restaurant.name, Restaurant.hashed_password
+    ).filter(Restaurant.email == request.email).first()
     
-    if not restaurant or not verify_password(request.password, restaurant.hashed_password):
+    # Always run bcrypt (against a dummy hash for unknown emails) so response
+    # time doesn't reveal whether an account exists
+    hashed_password = restaurant.hashed_password if restaurant else get_dummy_password_hash()
+    password_ok, new_hash = verify_and_update_password(request.password, hashed_password)
+    
+    if not restaurant or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
+    # Re-hash passwords stored at a stale bcrypt cost, so this account's
+    # next login costs the same as an unknown email's
+    if new_hash:
+        db.execute(
+            update(Restaurant)
+            .where(Restaurant.id == restaurant.id)
+            .values(hashed_password=new_hash)
+        )
+        db.commit()
+    
     # Create token
     access_token = create_access_token({"sub": restaurant.id})
     
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import List, Optional
 from core.database import get_db
 from core.auth import get_current_restaurant
+from core.cache import get_menu_response, set_menu_response, invalidate_menu
 from models.models import Restaurant, Product, Table, Order, OrderItem
 
 router = APIRouter(prefix="/api/menu", tags=["menu"])
@@ -24,8 +25,14 @@ class ProductResponse(BaseModel):
     image_url: Optional[str]
     is_available: bool
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Built once; validates ORM rows and dumps JSON in pydantic-core, skipping
+# FastAPI's per-response jsonable_encoder pass on the list read paths
+_product_list = TypeAdapter(List[ProductResponse])
+
+def _products_json(products) -> bytes:
+    return _product_list.dump_json(_product_list.validate_python(products, from_attributes=True))
 
 # Restaurant endpoints (protected)
 @router.get("/products", response_model=List[ProductResponse])
@@ -33,7 +40,9 @@ def get_products(
     restaurant: Restaurant = Depends(get_current_restaurant),
     db: Session = Depends(get_db)
 ):
-    return restaurant.products
+    # Explicit query rather than the lazy restaurant.products relationship
+    products = db.query(Product).filter(Product.restaurant_id == restaurant.id).all()
+    return Response(_products_json(products), media_type="application/json")
 
 @router.post("/products", response_model=ProductResponse)
 def create_product(
@@ -52,6 +61,7 @@ def create_product(
     db.add(product)
     db.commit()
     db.refresh(product)
+    invalidate_menu(restaurant.id)
     
     return product
 
@@ -76,6 +86,7 @@ def update_product(
     product.category = request.category
     product.image_url = request.image_url
     db.commit()
+    invalidate_menu(restaurant.id)
     
     return product
 
@@ -95,23 +106,35 @@ def delete_product(
     
     db.delete(product)
     db.commit()
+    invalidate_menu(restaurant.id)
     
     return {"success": True}
 
 # Public endpoints (by QR token)
 @router.get("/{qr_token}", response_model=List[ProductResponse])
-def get_menu_by_token(qr_token: str, db: Session = Depends(get_db)):
-    table = db.query(Table).filter(Table.qr_token == qr_token).first()
-    
-    if not table:
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    products = db.query(Product).filter(
-        Product.restaurant_id == table.restaurant_id,
-        Product.is_available == True
-    ).all()
-    
-    return products
+def get_menu_by_token(qr_token: str, request: Request, db: Session = Depends(get_db)):
+    # Serialized menu + ETag cached per QR token; invalidated on product edits
+    cached = get_menu_response(qr_token)
+    if cached is None:
+        table = db.query(Table).filter(Table.qr_token == qr_token).first()
+        
+        if not table:
+            raise HTTPException(status_code=404, detail="Table not found")
+        
+        products = db.query(Product).filter(
+            Product.restaurant_id == table.restaurant_id,
+            Product.is_available == True
+        ).all()
+        
+        body = _products_json(products)
+        cached = set_menu_response(qr_token, table.restaurant_id, body)
+    
+    etag, body = cached
+    # no-cache: browsers revalidate every load, which is a cheap 304 here
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 class CartItem(BaseModel):
     product_id: int
@@ -131,31 +154,42 @@ def checkout(
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     
-    # Create order
-    order = Order(
-        restaurant_id=table.restaurant_id,
-        table_id=table.id,
-        status="preparing"
-    )
-    db.add(order)
-    db.flush()
-    
-    # Add items
+    # Fetch every cart product in one query; scoping to the table's
+    # restaurant stops carts from ordering another restaurant's products
+    product_ids = {item.product_id for item in request.items}
+    products = {
+        p.id: p
+        for p in db.query(Product).filter(
+            Product.id.in_(product_ids),
+            Product.restaurant_id == table.restaurant_id,
+            Product.is_available == True
+        ).all()
+    }
+    
+    # Build items
     total = 0
+    order_items = []
     for item in request.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = products.get(item.product_id)
         if product:
-            order_item = OrderItem(
-                order_id=order.id,
+            order_items.append(OrderItem(
                 product_id=product.id,
                 quantity=item.quantity,
                 price=product.price
-            )
-            db.add(order_item)
+            ))
             total += product.price * item.quantity
     
-    order.total_price = total
+    # Create order (items are inserted with it via the relationship cascade)
+    order = Order(
+        restaurant_id=table.restaurant_id,
+        table_id=table.id,
+        status="preparing",
+        total_price=total,
+        items=order_items
+    )
+    db.add(order)
+    db.flush()
+    order_id = order.id
     db.commit()
-    db.refresh(order)
     
-    return {"order_id": order.id, "total": total}
+    return {"order_id": order_id, "total": total}
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
+from pydantic import BaseModel, ConfigDict
 from typing import List
 from core.database import get_db
 from core.auth import get_current_restaurant
+from core.cache import invalidate_table
 from models.models import Restaurant, Table, Order, OrderItem, OrderStatus
 from websocket.manager import manager
 import secrets
@@ -19,8 +23,7 @@ class TableResponse(BaseModel):
     qr_token: str
     is_active: bool
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class OrderItemResponse(BaseModel):
     id: int
@@ -28,8 +31,7 @@ class OrderItemResponse(BaseModel):
     quantity: int
     price: float
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class OrderResponse(BaseModel):
     id: int
@@ -39,15 +41,29 @@ class OrderResponse(BaseModel):
     items: List[dict]
     created_at: str
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
-@router.get("/tables", response_model=List[TableResponse])
+# The list endpoints below build trusted plain dicts and return them as
+# ORJSONResponse, skipping response_model validation; `responses` keeps the
+# schema in the OpenAPI docs
+@router.get("/tables", responses={200: {"model": List[TableResponse]}})
 def get_tables(
     restaurant: Restaurant = Depends(get_current_restaurant),
     db: Session = Depends(get_db)
 ):
-    return restaurant.tables
+    rows = db.query(Table.id, Table.table_number, Table.qr_token, Table.is_active).filter(
+        Table.restaurant_id == restaurant.id
+    ).all()
+    
+    return ORJSONResponse([
+        {
+            "id": id,
+            "table_number": table_number,
+            "qr_token": qr_token,
+            "is_active": is_active
+        }
+        for id, table_number, qr_token, is_active in rows
+    ])
 
 @router.post("/tables", response_model=TableResponse)
 def create_table(
@@ -55,8 +71,10 @@ def create_table(
     restaurant: Restaurant = Depends(get_current_restaurant),
     db: Session = Depends(get_db)
 ):
-    # Check if table number exists
-    existing = db.query(Table).filter(
+    # Check if table number exists. Databases created before
+    # uq_rest_table_num (create_all never alters existing tables) rely on
+    # this check alone; where the constraint exists it also closes the race
+    existing = db.query(Table.id).filter(
         Table.restaurant_id == restaurant.id,
         Table.table_number == request.table_number
     ).first()
@@ -64,16 +82,25 @@ def create_table(
     if existing:
         raise HTTPException(status_code=400, detail="Table number already exists")
     
-    # Create table with unique QR token
-    qr_token = secrets.token_urlsafe(16)
-    
-    table = Table(
-        restaurant_id=restaurant.id,
-        table_number=request.table_number,
-        qr_token=qr_token
-    )
-    db.add(table)
-    db.commit()
+    # Create table with unique QR token; the unique index on qr_token is the
+    # collision check (regenerate and retry)
+    for attempt in range(3):
+        table = Table(
+            restaurant_id=restaurant.id,
+            table_number=request.table_number,
+            qr_token=secrets.token_urlsafe(16)
+        )
+        db.add(table)
+        try:
+            db.commit()
+            break
+        except IntegrityError as e:
+            db.rollback()
+            detail = str(e.orig)
+            if "uq_rest_table_num" in detail or "table_number" in detail:
+                raise HTTPException(status_code=400, detail="Table number already exists")
+            if "qr_token" not in detail or attempt == 2:
+                raise
     db.refresh(table)
     
     return table
@@ -92,19 +119,31 @@ def delete_table(
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     
+    qr_token = table.qr_token
     db.delete(table)
     db.commit()
+    invalidate_table(qr_token)
     
     return {"success": True}
 
-@router.get("/orders", response_model=List[OrderResponse])
+@router.get("/orders", responses={200: {"model": List[OrderResponse]}})
 def get_orders(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     restaurant: Restaurant = Depends(get_current_restaurant),
     db: Session = Depends(get_db)
 ):
-    orders = db.query(Order).filter(
+    # Eager-load table, items and item products: 3 queries per page
+    # instead of 1 + one per order (table, items) + one per item (product).
+    # raiseload('*') turns any relationship not listed here into an error
+    # instead of a silent extra query
+    orders = db.query(Order).options(
+        joinedload(Order.table),
+        selectinload(Order.items).joinedload(OrderItem.product),
+        raiseload('*')
+    ).filter(
         Order.restaurant_id == restaurant.id
-    ).order_by(Order.created_at.desc()).all()
+    ).order_by(Order.created_at.desc()).limit(limit).offset(offset).all()
     
     result = []
     for order in orders:
@@ -122,10 +161,12 @@ def get_orders(
                 }
                 for item in order.items
             ],
-            "created_at": order.created_at.isoformat()
+            # orjson writes datetimes as ISO 8601 natively (same string as
+            # .isoformat() for these naive UTC timestamps)
+            "created_at": order.created_at
         })
     
-    return result
+    return ORJSONResponse(result)
 
 class OrderStatusUpdate(BaseModel):
     status: str
@@ -137,29 +178,39 @@ async def update_order_status(
     restaurant: Restaurant = Depends(get_current_restaurant),
     db: Session = Depends(get_db)
 ):
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.restaurant_id == restaurant.id
+    new_status = OrderStatus(request.status)
+    
+    # Single primary-key UPDATE; RETURNING hands back the table's QR token
+    # through a correlated subquery, so neither the order nor the table is
+    # loaded in a separate round trip
+    row = db.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.restaurant_id == restaurant.id)
+        .values(status=new_status)
+        .returning(
+            select(Table.qr_token)
+            .where(Table.id == Order.table_id)
+            .scalar_subquery()
+            .label("qr_token")
+        )
     ).first()
     
-    if not order:
+    if row is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    # Update status
-    order.status = OrderStatus(request.status)
     db.commit()
     
-    # Notify via WebSocket
-    await manager.send_to_restaurant(restaurant.id, {
+    # Notify via WebSocket (queued; delivery doesn't hold up the response)
+    manager.send_to_restaurant(restaurant.id, {
         "type": "order_update",
-        "order_id": order.id,
-        "status": order.status.value
+        "order_id": order_id,
+        "status": new_status.value
     })
     
-    await manager.send_to_table(order.table.qr_token, {
+    manager.send_to_table(row.qr_token, {
         "type": "order_status",
-        "order_id": order.id,
-        "status": order.status.value
+        "order_id": order_id,
+        "status": new_status.value
     })
     
     return {"success": True}
@@ -1,210 +1,330 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from sqlalchemy import select, bindparam
 from sqlalchemy.orm import Session
-from core.database import get_db
+from core.database import SessionLocal
+from core.cache import get_menu_context, set_menu_context, get_table, set_table
 from models.models import Table, Product
 from services import STTService, TTSService, LLMService
+from services.llm import SpokenResponseExtractor
 from websocket.manager import manager
-import json
 import asyncio
+import logging
 import time
+import orjson
 
 router = APIRouter()
+logger = logging.getLogger("voice")
 
 # Initialize services
 stt_service = STTService()
 tts_service = TTSService()
 llm_service = LLMService()
 
+# Constant control frames, encoded once at import instead of per send
+_STATUS_PROCESSING = orjson.dumps({"type": "status", "message": "processing"}).decode()
+_TTS_START = orjson.dumps({"type": "tts_start"}).decode()
+_TTS_COMPLETE = orjson.dumps({"type": "tts_complete"}).decode()
+_PONG = orjson.dumps({"type": "pong"}).decode()
+
+# Connect-path lookups, built once at import. Statements with bound
+# parameters hit SQLAlchemy's compiled cache on every execute instead of
+# going through Query construction each time
+_TABLE_STMT = select(Table.id, Table.restaurant_id, Table.table_number).where(
+    Table.qr_token == bindparam("qr_token")
+)
+_MENU_STMT = select(Product.name, Product.price, Product.description).where(
+    Product.restaurant_id == bindparam("restaurant_id"),
+    Product.is_available == True
+)
+
+def resolve_table(db: Session, qr_token: str):
+    """(table_id, restaurant_id, table_number) for a QR token, or None"""
+    table = get_table(qr_token)
+    if table is None:
+        row = db.execute(_TABLE_STMT, {"qr_token": qr_token}).first()
+        if row is None:
+            return None
+        table = tuple(row)
+        set_table(qr_token, table)
+    return table
+
+def load_menu_context(db: Session, restaurant_id: int) -> str:
+    """LLM menu context for a restaurant, cached until its products change"""
+    menu_context = get_menu_context(restaurant_id)
+    if menu_context is None:
+        # Only the three columns the prompt uses - plain rows, no ORM instances
+        rows = db.execute(_MENU_STMT, {"restaurant_id": restaurant_id}).all()
+        
+        menu_context = "\n".join([
+            f"- {name}: {price}TL ({description})"
+            for name, price, description in rows
+        ])
+        set_menu_context(restaurant_id, menu_context)
+    return menu_context
+
+def load_voice_context(qr_token: str):
+    """
+    Table + menu context for a voice session, or (None, None)
+    Sync DB work - called via asyncio.to_thread so cache misses don't
+    block every other socket on the event loop
+    """
+    db = SessionLocal()
+    try:
+        table = resolve_table(db, qr_token)
+        if table is None:
+            return None, None
+        return table, load_menu_context(db, table[1])
+    finally:
+        db.close()
+
+async def send_json_fast(websocket: WebSocket, message: dict):
+    """
+    send_json replacement: orjson encodes in native code. Still a text
+    frame - binary frames are reserved for PCM audio
+    """
+    await websocket.send_text(orjson.dumps(message).decode())
+
+# ai_token frames carry only new text (the client accumulates), coalesced
+# so a burst of LLM tokens goes out as one frame
+TOKEN_BATCH_INTERVAL = 0.02  # seconds
+TOKEN_BATCH_MAX_CHARS = 64
+
+class TokenBatcher:
+    """Buffers LLM token deltas and flushes them as one ai_token frame"""
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self._tokens = []
+        self._size = 0
+        self._timer = None
+        # One ai_token send at a time: the client appends deltas in the
+        # order they arrive, so a timed flush and a size flush must not overlap
+        self._lock = asyncio.Lock()
+    
+    async def add(self, token: str):
+        self._tokens.append(token)
+        self._size += len(token)
+        if self._size >= TOKEN_BATCH_MAX_CHARS:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        await asyncio.sleep(TOKEN_BATCH_INTERVAL)
+        self._timer = None
+        try:
+            await self.flush()
+        except (WebSocketDisconnect, RuntimeError):
+            pass  # socket closed mid-turn; the handler deals with it
+        except Exception:
+            logger.exception("Timed ai_token flush failed")
+    
+    def cancel(self):
+        """Drop the pending timed flush (turn finished or aborted)"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+    
+    async def flush(self):
+        self.cancel()
+        async with self._lock:
+            if not self._tokens:
+                return
+            token = "".join(self._tokens)
+            self._tokens = []
+            self._size = 0
+            await send_json_fast(self.websocket, {
+                "type": "ai_token",
+                "token": token
+            })
+
+# Audio goes out in 640-byte-aligned chunks, i.e. a whole number of 20ms
+# frames of 16kHz mono PCM16 per send. The client's Int16Array view rejects
+# odd byte lengths, and no send ever ends mid-frame, however the TTS
+# stream happens to chunk its output
+AUDIO_FRAME_BYTES = 640
+
+async def stream_tts(websocket: WebSocket, text: str, start_time: float, label: str):
+    """Stream TTS audio for text to the client as binary PCM frames"""
+    chunk_count = 0
+    scratch = bytearray()
+    async for audio_chunk in tts_service.speak_stream(text, start_time):
+        if not audio_chunk:
+            continue
+        scratch += audio_chunk
+        # Every whole frame buffered so far goes out together in one send
+        n = len(scratch) - len(scratch) % AUDIO_FRAME_BYTES
+        if n:
+            if chunk_count == 0:
+                elapsed = time.perf_counter() - start_time
+                logger.info("[Audio playback start]: %06.3fs (%s)", elapsed, label)
+            chunk_count += 1
+            with memoryview(scratch) as view:
+                frame = view[:n].tobytes()
+            del scratch[:n]
+            await websocket.send_bytes(frame)
+    
+    # Tail shorter than a frame, trimmed to whole samples
+    n = len(scratch) & ~1
+    if n:
+        await websocket.send_bytes(bytes(scratch[:n]))
+
+async def handle_utterance(websocket: WebSocket, audio_data: bytes, menu_context: str):
+    """
+    One voice turn: STT -> streamed LLM reply -> TTS audio
+    TTS starts in parallel once spoken_response has streamed in, or runs
+    once after the reply as a fallback
+    """
+    start_time = time.perf_counter()
+    logger.debug("=" * 60)
+    logger.info("[START] User audio received: 00:00.000")
+    logger.debug("🎤 Audio chunk size: %s bytes", len(audio_data))
+    
+    await websocket.send_text(_STATUS_PROCESSING)
+    
+    # 1. STT - Transcribe audio
+    transcript = await stt_service.transcribe_stream(audio_data, start_time)
+    logger.debug("📝 Transcript: %s", transcript)
+    
+    if transcript and transcript.strip():
+        await send_json_fast(websocket, {
+            "type": "transcript",
+            "text": transcript
+        })
+        
+        tts_task = None
+        token_batcher = None
+        try:
+            # 2. LLM - Stream response with parallel TTS trigger
+            full_response = ""
+            structured_data = None
+            first_token_logged = False
+            first_sentence_complete = False
+            spoken_extractor = SpokenResponseExtractor()
+            token_batcher = TokenBatcher(websocket)
+            
+            async for llm_event in llm_service.generate_stream(transcript, menu_context, start_time):
+                if llm_event["type"] == "token":
+                    if not first_token_logged:
+                        elapsed = time.perf_counter() - start_time
+                        logger.info("[LLM first token]: %06.3fs", elapsed)
+                        first_token_logged = True
+                        
+                    await token_batcher.add(llm_event["content"])
+                    full_response = llm_event["full_text"]
+                    
+                    # Start TTS in parallel as soon as the spoken_response
+                    # value has fully streamed in (only the new tail is scanned)
+                    if not first_sentence_complete:
+                        first_sentence = spoken_extractor.feed(full_response)
+                        if first_sentence and first_sentence.strip():
+                            logger.debug("⚡ Parallel TTS: Starting TTS for first sentence: %s...", first_sentence[:50])
+                            first_sentence_complete = True
+                            
+                            # Send tts_start immediately
+                            await websocket.send_text(_TTS_START)
+                            
+                            # Start TTS task in parallel
+                            tts_task = asyncio.create_task(
+                                stream_tts(websocket, first_sentence, start_time, "parallel TTS first chunk")
+                            )
+                    
+                elif llm_event["type"] == "complete":
+                    structured_data = llm_event["structured"]
+                    elapsed = time.perf_counter() - start_time
+                    logger.info("[LLM complete]: %06.3fs", elapsed)
+                    logger.debug("🎯 LLM Complete - Structured data: %s", structured_data)
+                    await token_batcher.flush()
+                    await send_json_fast(websocket, {
+                        "type": "ai_complete",
+                        "data": structured_data
+                    })
+            
+            # 3. One TTS path: the parallel stream if it already started,
+            # otherwise synthesize the spoken part of the complete reply once
+            tts_mode = "parallel"
+            if tts_task is None:
+                tts_mode = "fallback"
+                if structured_data and "spoken_response" in structured_data:
+                    tts_text = structured_data["spoken_response"]
+                else:
+                    tts_text = full_response
+                
+                if not (tts_text and tts_text.strip()):
+                    logger.warning("⚠️ No spoken_response to synthesize")
+                    return
+                
+                logger.debug("🔍 Fallback TTS: Will synthesize: %s", tts_text)
+                await websocket.send_text(_TTS_START)
+                tts_task = asyncio.create_task(
+                    stream_tts(websocket, tts_text, start_time, "fallback TTS first chunk")
+                )
+            
+            logger.debug("⏳ Waiting for %s TTS to complete...", tts_mode)
+            await tts_task
+            await websocket.send_text(_TTS_COMPLETE)
+            elapsed = time.perf_counter() - start_time
+            logger.info("[COMPLETE] Total pipeline (with %s TTS): %06.3fs", tts_mode, elapsed)
+            logger.debug("=" * 60)
+        finally:
+            # Turn aborted (client gone, error): stop the parallel TTS stream
+            # instead of letting it synthesize and send the rest
+            if tts_task and not tts_task.done():
+                tts_task.cancel()
+            # ...and any timed ai_token flush still waiting to write
+            if token_batcher:
+                token_batcher.cancel()
+
 @router.websocket("/ws/voice/{table_id}")
-async def voice_websocket(websocket: WebSocket, table_id: str, db: Session = Depends(get_db)):
+async def voice_websocket(websocket: WebSocket, table_id: str):
     """
     Streaming voice AI endpoint
     Flow: Audio chunks -> STT -> LLM stream -> TTS stream -> Audio chunks back
     """
     await manager.connect(websocket, table_id)
     
-    # Verify table exists
-    table = db.query(Table).filter(Table.qr_token == table_id).first()
+    # Verify table exists and get menu context for LLM. Both usually come
+    # straight from the caches; only a miss pays for a thread hop + Session
+    table = get_table(table_id)
+    menu_context = get_menu_context(table[1]) if table else None
+    if menu_context is None:
+        table, menu_context = await asyncio.to_thread(load_voice_context, table_id)
     if not table:
         await websocket.close(code=4004, reason="Table not found")
+        manager.disconnect(websocket, table_id)
         return
     
-    # Get menu context for LLM
-    products = db.query(Product).filter(
-        Product.restaurant_id == table.restaurant_id,
-        Product.is_available == True
-    ).all()
-    
-    menu_context = "\n".join([
-        f"- {p.name}: {p.price}TL ({p.description})"
-        for p in products
-    ])
-    
     try:
         while True:
             # Receive message from client
             data = await websocket.receive()
             
-            if "bytes" in data:
+            # Liveness is handled by protocol-level ping frames (uvicorn
+            # --ws-ping-interval); a close arrives here as a plain message,
+            # so a normal disconnect just ends the loop (no exception)
+            if data["type"] == "websocket.disconnect":
+                break
+            
+            # Binary frames are audio, text frames are control messages
+            audio_data = data.get("bytes")
+            if audio_data is not None:
                 # Audio chunk received - process immediately
-                audio_data = data["bytes"]
-                start_time = time.time()
-                print(f"\n{'='*60}")
-                print(f"[START] User audio received: 00:00.000")
-                print(f"🎤 Audio chunk size: {len(audio_data)} bytes")
-                
-                await websocket.send_json({"type": "status", "message": "processing"})
-                
-                # 1. STT - Transcribe audio
-                transcript = await stt_service.transcribe_stream(audio_data, start_time)
-                print(f"📝 Transcript: {transcript}")
+                await handle_utterance(websocket, audio_data, menu_context)
                 
-                if transcript and transcript.strip():
-                    await websocket.send_json({
-                        "type": "transcript",
-                        "text": transcript
-                    })
-                    
-                    # 2. LLM - Stream response with parallel TTS trigger
-                    full_response = ""
-                    structured_data = None
-                    first_token_logged = False
-                    first_sentence_complete = False
-                    tts_task = None
-                    first_sentence = ""
-                    
-                    async for llm_event in llm_service.generate_stream(transcript, menu_context, start_time):
-                        if llm_event["type"] == "token":
-                            if not first_token_logged:
-                                elapsed = time.time() - start_time
-                                print(f"[LLM first token]: {elapsed:06.3f}s")
-                                first_token_logged = True
-                                
-                            await websocket.send_json({
-                                "type": "ai_token",
-                                "token": llm_event["content"],
-                                "full_text": llm_event["full_text"]
-                            })
-                            full_response = llm_event["full_text"]
-                            
-                            # Check if first sentence is complete (ends with . ! ?)
-                            # and start TTS in parallel
-                            if not first_sentence_complete and full_response:
-                                import re
-                                # Look for sentence-ending punctuation
-                                match = re.search(r'[.!?]\s*', full_response)
-                                if match:
-                                    first_sentence = full_response[:match.end()].strip()
-                                    
-                                    # Extract just the spoken part (remove JSON if present)
-                                    if '"spoken_response"' in first_sentence:
-                                        try:
-                                            # Extract from JSON
-                                            spoken_match = re.search(r'"spoken_response"\s*:\s*"([^"]+)"', full_response)
-                                            if spoken_match:
-                                                first_sentence = spoken_match.group(1)
-                                                
-                                                # Start TTS in background
-                                                print(f"⚡ Parallel TTS: Starting TTS for first sentence: {first_sentence[:50]}...")
-                                                first_sentence_complete = True
-                                                
-                                                # Send tts_start immediately
-                                                await websocket.send_json({"type": "tts_start"})
-                                                
-                                                # Start TTS task in parallel
-                                                async def stream_tts_parallel():
-                                                    chunk_count = 0
-                                                    async for audio_chunk in tts_service.speak_stream(first_sentence, start_time):
-                                                        if audio_chunk:
-                                                            if chunk_count == 0:
-                                                                elapsed = time.time() - start_time
-                                                                print(f"[Audio playback start]: {elapsed:06.3f}s (parallel TTS first chunk)")
-                                                            chunk_count += 1
-                                                            await websocket.send_bytes(audio_chunk)
-                                                
-                                                tts_task = asyncio.create_task(stream_tts_parallel())
-                                        except Exception as e:
-                                            print(f"⚠️ Parallel TTS parse error: {e}")
-                            
-                        elif llm_event["type"] == "complete":
-                            structured_data = llm_event["structured"]
-                            elapsed = time.time() - start_time
-                            print(f"[LLM complete]: {elapsed:06.3f}s")
-                            print(f"🎯 LLM Complete - Structured data: {structured_data}")
-                            await websocket.send_json({
-                                "type": "ai_complete",
-                                "data": structured_data
-                            })
-                    
-                    # 3. Wait for parallel TTS or start new TTS
-                    if tts_task:
-                        # Wait for parallel TTS to complete
-                        print("⏳ Waiting for parallel TTS to complete...")
-                        await tts_task
-                        await websocket.send_json({"type": "tts_complete"})
-                        elapsed = time.time() - start_time
-                        print(f"[COMPLETE] Total pipeline (with parallel TTS): {elapsed:06.3f}s")
-                        print(f"{'='*60}\n")
-                    else:
-                        # Fallback: No parallel TTS was triggered, do full TTS
-                        print(f"🔍 Fallback TTS: Starting full TTS for complete response")
-                        
-                        if structured_data and "spoken_response" in structured_data:
-                            tts_text = structured_data["spoken_response"]
-                        else:
-                            tts_text = full_response
-                        
-                        await websocket.send_json({"type": "tts_start"})
-                        
-                        chunk_count = 0
-                        async for audio_chunk in tts_service.speak_stream(tts_text, start_time):
-                            if audio_chunk:
-                                if chunk_count == 0:
-                                    elapsed = time.time() - start_time
-                                    print(f"[Audio playback start]: {elapsed:06.3f}s (fallback TTS first chunk)")
-                                chunk_count += 1
-                                await websocket.send_bytes(audio_chunk)
-                        
-                        await websocket.send_json({"type": "tts_complete"})
-                        elapsed = time.time() - start_time
-                        print(f"[COMPLETE] Total pipeline (with fallback TTS): {elapsed:06.3f}s")
-                        print(f"{'='*60}\n")
-                        if structured_data and "spoken_response" in structured_data:
-                            spoken_text = structured_data["spoken_response"]
-                            print(f"🗣️ TTS: Will synthesize: {spoken_text}")
-                            
-                            if spoken_text and spoken_text.strip():
-                                await websocket.send_json({"type": "tts_start"})
-                                
-                                chunk_count = 0
-                                async for audio_chunk in tts_service.speak_stream(spoken_text, start_time):
-                                    if audio_chunk:
-                                        if chunk_count == 0:
-                                            elapsed = time.time() - start_time
-                                            print(f"[Audio playback start]: {elapsed:06.3f}s (first chunk sent)")
-                                        chunk_count += 1
-                                        await websocket.send_bytes(audio_chunk)
-                                
-                                await websocket.send_json({"type": "tts_complete"})
-                                elapsed = time.time() - start_time
-                                print(f"[COMPLETE] Total pipeline: {elapsed:06.3f}s")
-                                print(f"{'='*60}\n")
-                            else:
-                                print("⚠️ No spoken_response to synthesize")
-                        else:
-                            print(f"❌ TTS: No structured_data or spoken_response. Data: {structured_data}")
-                
-            elif "text" in data:
-                message = json.loads(data["text"])
+            elif data.get("text") is not None:
+                message = orjson.loads(data["text"])
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await websocket.send_text(_PONG)
                     
     except WebSocketDisconnect:
-        manager.disconnect(websocket, table_id)
+        pass  # client vanished mid-send
     except Exception as e:
-        print(f"WebSocket error: {e}")
-        await websocket.send_json({
-            "type": "error",
-            "message": str(e)
-        })
+        logger.exception("WebSocket error: %s", e)
+        try:
+            await send_json_fast(websocket, {
+                "type": "error",
+                "message": str(e)
+            })
+        except Exception:
+            pass  # socket already unusable
+    finally:
         manager.disconnect(websocket, table_id)
@@ -4,11 +4,11 @@ GarsonAI Voice Pipeline — OPTIMIZED Version
 
 Key optimizations over the original:
   1. encode_file() instead of upload_file() — eliminates ~2s CDN upload
-  2. OpenAI-compatible streaming LLM — first sentence captured ~500ms earlier
+  2. Raw SSE streaming LLM (httpx + orjson) — first sentence captured ~500ms earlier
   3. Parallel TTS: fires TTS on first sentence while LLM still streams
   4. Cached phrase detection happens BEFORE TTS call
   5. Reduced silence duration for faster turn detection
-  6. Pre-warmed OpenAI client (persistent HTTP connection)
+  6. Pre-warmed HTTP client (persistent connection to the LLM endpoint)
 
 Expected latency improvements:
   - Upload: 2,000ms → ~5ms   (base64 encode is local)
@@ -32,12 +32,15 @@ import tempfile
 import threading
 import time
 import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 
+import httpx
 import numpy as np
+import orjson
 import pyaudio
 import requests
 import fal_client
-from openai import OpenAI
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
@@ -87,15 +90,11 @@ def rms(data: bytes) -> float:
 
 
 def trim_silence(frames, sample_rate, chunk_size, threshold, padding_sec):
-    energies = [rms(f) for f in frames]
-    first_voice = last_voice = None
-    for i, e in enumerate(energies):
-        if e > threshold:
-            if first_voice is None:
-                first_voice = i
-            last_voice = i
-    if first_voice is None:
+    energies = np.fromiter((rms(f) for f in frames), dtype=np.float64, count=len(frames))
+    voiced = np.flatnonzero(energies > threshold)
+    if voiced.size == 0:
         return []
+    first_voice, last_voice = int(voiced[0]), int(voiced[-1])
     padding_frames = int(padding_sec * sample_rate / chunk_size)
     start = max(0, first_voice - padding_frames)
     end = min(len(frames), last_voice + padding_frames + 1)
@@ -108,7 +107,11 @@ def frames_to_wav_bytes(frames, sample_rate, channels):
         wf.setnchannels(channels)
         wf.setsampwidth(2)
         wf.setframerate(sample_rate)
-        wf.writeframes(b''.join(frames))
+        # Stream frames straight into the buffer instead of joining them
+        # into one more full-size copy first; the header sizes are
+        # patched on close
+        for frame in frames:
+            wf.writeframesraw(frame)
     return buf.getvalue()
 
 
@@ -144,10 +147,26 @@ def _normalize(text):
     return re.sub(r'[^\w\s]', '', text.strip().lower())
 
 
-def warm_phrase_cache():
+def _generate_phrase(phrase, key):
+    tts_url = api_tts(phrase)
+    resp = requests.get(tts_url, timeout=60)
+    resp.raise_for_status()
+    ext = '.wav'
+    for e in ('.mp3', '.ogg', '.aac', '.flac'):
+        if e in tts_url:
+            ext = e
+            break
+    cached_path = os.path.join(CACHE_DIR, f"{key}{ext}")
+    with open(cached_path, 'wb') as f:
+        f.write(resp.content)
+    return cached_path
+
+
+def warm_phrase_cache(max_workers=8):
     os.makedirs(CACHE_DIR, exist_ok=True)
     log("caching", f"warming phrase cache ({len(COMMON_PHRASES)} phrases)...")
 
+    missing = []
     for phrase in COMMON_PHRASES:
         key = _normalize(phrase)
         for ext in ('.wav', '.mp3', '.ogg', '.aac', '.flac'):
@@ -157,32 +176,53 @@ def warm_phrase_cache():
                 log("caching", f'  ✓ cached (disk): "{phrase}"')
                 break
         else:
-            t0 = time.perf_counter()
-            try:
-                tts_url = api_tts(phrase)
-                resp = requests.get(tts_url, timeout=60)
-                resp.raise_for_status()
-                ext = '.wav'
-                for e in ('.mp3', '.ogg', '.aac', '.flac'):
-                    if e in tts_url:
-                        ext = e
-                        break
-                cached_path = os.path.join(CACHE_DIR, f"{key}{ext}")
-                with open(cached_path, 'wb') as f:
-                    f.write(resp.content)
-                _phrase_cache[key] = cached_path
-                ms = (time.perf_counter() - t0) * 1000
-                log("caching", f'  ✓ generated: "{phrase}"', ms)
-            except Exception as e:
+            missing.append((phrase, key))
+
+    # 🚀 OPT: generate missing phrases concurrently instead of one by one
+    if missing:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_generate_phrase, phrase, key): (phrase, key)
+                for phrase, key in missing
+            }
+            for future in as_completed(futures):
+                phrase, key = futures[future]
                 ms = (time.perf_counter() - t0) * 1000
-                log("caching", f'  ✘ FAILED: "{phrase}" — {e}', ms)
+                try:
+                    _phrase_cache[key] = future.result()
+                    log("caching", f'  ✓ generated: "{phrase}"', ms)
+                except Exception as e:
+                    log("caching", f'  ✘ FAILED: "{phrase}" — {e}', ms)
 
     log("caching", f"{len(_phrase_cache)}/{len(COMMON_PHRASES)} phrases cached")
 
 
+FILLER_WORDS = frozenset({"efendim", "lütfen"})
+
+
+def _near_miss_lookup(key):
+    # Whitespace and one trailing filler word only; fuzzy scores would
+    # match negations like "alıyorum" / "almıyorum"
+    words = key.split()
+    if not words:
+        return None
+    candidates = [" ".join(words)]
+    if len(words) > 1 and words[-1] in FILLER_WORDS:
+        candidates.append(" ".join(words[:-1]))
+    candidates += [f"{candidates[0]} {w}" for w in FILLER_WORDS]
+    for candidate in candidates:
+        path = _phrase_cache.get(candidate)
+        if path:
+            return path
+    return None
+
+
 def lookup_phrase_cache(text):
     key = _normalize(text)
     path = _phrase_cache.get(key)
+    if path is None:
+        path = _near_miss_lookup(key)
     if path and os.path.exists(path):
         return path
     return None
@@ -209,20 +249,26 @@ SYSTEM_PROMPT = (
     "continue with the rest of your answer.\n"
 )
 
-# ── Pre-warm OpenAI client for persistent HTTP connection ──
+# ── Pre-warm LLM HTTP client for persistent connection ──
 FAL_KEY = os.environ.get("FAL_KEY", "")
-_openai_client = None
-
-
-def get_openai_client():
-    global _openai_client
-    if _openai_client is None:
-        _openai_client = OpenAI(
-            base_url="https://fal.run/openrouter/router/openai/v1",
-            api_key="not-needed",
-            default_headers={"Authorization": f"Key {FAL_KEY}"},
-        )
-    return _openai_client
+LLM_BASE_URL = "https://fal.run/openrouter/router/openai/v1"
+
+
+@lru_cache(maxsize=1)
+def get_llm_http_client():
+    # httpx drops idle connections after 5s by default, which is shorter
+    # than a typical user turn — keep them for a minute so every turn
+    # reuses the same TLS connection to fal.run
+    return httpx.Client(
+        base_url=LLM_BASE_URL,
+        headers={"Authorization": f"Key {FAL_KEY}"},
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_connections=10,
+            max_keepalive_connections=8,
+            keepalive_expiry=60.0,
+        ),
+    )
 
 
 def api_stt(audio_url: str) -> str:
@@ -243,25 +289,39 @@ def api_stt(audio_url: str) -> str:
 def api_llm_stream(prompt: str):
     """
     OpenAI-compatible streaming LLM via fal's OpenRouter.
+    Parses the SSE frames directly with orjson instead of going through
+    the SDK's per-chunk model construction.
     Yields (token, is_first_token) tuples.
     """
-    client = get_openai_client()
-    stream = client.chat.completions.create(
-        model="google/gemini-2.5-flash-lite",
-        messages=[
+    client = get_llm_http_client()
+    payload = {
+        "model": "google/gemini-2.5-flash-lite",
+        "messages": [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
-        temperature=0.4,
-        stream=True,
-    )
+        "temperature": 0.4,
+        "stream": True,
+    }
 
     is_first = True
-    for chunk in stream:
-        if chunk.choices and chunk.choices[0].delta.content:
-            token = chunk.choices[0].delta.content
-            yield token, is_first
-            is_first = False
+    with client.stream("POST", "/chat/completions",
+                       content=orjson.dumps(payload),
+                       headers={"Content-Type": "application/json"}) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            choices = orjson.loads(data).get("choices")
+            if not choices:
+                continue
+            token = choices[0].get("delta", {}).get("content")
+            if token:
+                yield token, is_first
+                is_first = False
 
 
 def api_tts(text: str) -> str:
@@ -291,14 +351,20 @@ def upload_audio_for_stt(wav_bytes: bytes) -> str:
 #  OPTIMIZATION 2: Sentence-level streaming from LLM
 # ═══════════════════════════════════════════════════════════════════
 
-def stream_llm_sentences(prompt: str):
+def stream_llm_sentences(prompt: str, stats: dict | None = None):
     """
     Stream LLM response and yield complete sentences as they form.
     This allows TTS to start on the first sentence while the LLM
     is still generating the rest.
+
+    If `stats` is given, the perf_counter() timestamp of every content
+    token is appended to stats["token_times"] (for TTFT / TBT / TPOT).
     """
     buffer = ""
+    token_times = stats.setdefault("token_times", []) if stats is not None else None
     for token, is_first in api_llm_stream(prompt):
+        if token_times is not None:
+            token_times.append(time.perf_counter())
         buffer += token
         # Check if we have a complete sentence
         while True:
@@ -320,12 +386,16 @@ def stream_llm_sentences(prompt: str):
 #  Text Chunking (same as original but works with sentences)
 # ═══════════════════════════════════════════════════════════════════
 
+_PHRASE_PREFIX_INDEX = {p.lower(): p for p in COMMON_PHRASES}
+_PHRASE_PREFIX_LENGTHS = sorted({len(k) for k in _PHRASE_PREFIX_INDEX}, reverse=True)
+
+
 def _split_leading_phrase(text):
     lower = text.lower()
-    for phrase in sorted(COMMON_PHRASES, key=len, reverse=True):
-        if lower.startswith(phrase.lower()):
-            rest = text[len(phrase):].strip()
-            return phrase, rest
+    for n in _PHRASE_PREFIX_LENGTHS:
+        phrase = _PHRASE_PREFIX_INDEX.get(lower[:n])
+        if phrase:
+            return phrase, text[n:].strip()
     return None, text
 
 
@@ -349,6 +419,20 @@ def play_audio_file(path):
     subprocess.run(["afplay", path], check=True)
 
 
+def synthesize_sentence(sentence, label, preview):
+    """TTS + download one sentence; runs on the TTS pool."""
+    t_tts = time.perf_counter()
+    tts_url = api_tts(sentence)
+    gen_ms = (time.perf_counter() - t_tts) * 1000
+    log("generating", f'{label}: "{preview}"', gen_ms)
+
+    t_dl = time.perf_counter()
+    audio_path = download_audio(tts_url)
+    dl_ms = (time.perf_counter() - t_dl) * 1000
+    log("generating", f"{label}: downloaded", dl_ms)
+    return audio_path
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  OPTIMIZED Pipeline Loop
 # ═══════════════════════════════════════════════════════════════════
@@ -365,7 +449,7 @@ def run_pipeline(args):
     print(f"{Colors.BOLD}{'═' * 62}{Colors.RESET}")
     print(f"  {Colors.OPTIMIZED}Optimizations active:{Colors.RESET}")
     print(f"    ✓ encode_file() — no CDN upload (~2s saved)")
-    print(f"    ✓ OpenAI streaming LLM — early sentence capture")
+    print(f"    ✓ Streaming LLM (raw SSE) — early sentence capture")
     print(f"    ✓ Parallel TTS — fires on first sentence")
     print(f"    ✓ Phrase cache — instant first audio for openers")
     print(f"    ✓ Pre-warmed HTTP client — persistent connection")
@@ -385,14 +469,18 @@ def run_pipeline(args):
     # ── Warm up ──
     warm_phrase_cache()
 
-    # Pre-warm OpenAI client
-    log("optimized", "pre-warming OpenAI client...")
-    get_openai_client()
+    # Pre-warm LLM HTTP client
+    log("optimized", "pre-warming LLM client...")
+    get_llm_http_client()
     log("optimized", "client ready")
     print()
 
     turn_number = 0
 
+    # Sentence TTS runs here so synthesis overlaps the LLM stream and
+    # sentence N+1 is generated while sentence N is still being fetched
+    tts_pool = ThreadPoolExecutor(max_workers=4)
+
     try:
         while True:
 
@@ -499,6 +587,9 @@ def run_pipeline(args):
                 "first_token_ms": None,
                 "first_sentence_ms": None,
                 "total_ms": None,
+                "tbt_p50_ms": None,
+                "tbt_p95_ms": None,
+                "tpot_ms": None,
                 "full_text": "",
             }
 
@@ -509,12 +600,15 @@ def run_pipeline(args):
                 """
                 t_llm_start = time.perf_counter()
                 sentence_idx = 0
+                token_stats = {}
 
                 try:
-                    for sentence in stream_llm_sentences(transcript):
+                    for sentence in stream_llm_sentences(transcript, token_stats):
                         now = time.perf_counter()
                         if llm_stats["first_token_ms"] is None:
-                            llm_stats["first_token_ms"] = (now - t_llm_start) * 1000
+                            token_times = token_stats.get("token_times") or [now]
+                            first_token_at = token_times[0]
+                            llm_stats["first_token_ms"] = (first_token_at - t_llm_start) * 1000
                         if sentence_idx == 0:
                             llm_stats["first_sentence_ms"] = (now - t_llm_start) * 1000
 
@@ -526,33 +620,29 @@ def run_pipeline(args):
                         cached = lookup_phrase_cache(sentence)
                         if cached:
                             log("generating", f'{label}: "{preview}" ⚡ CACHED', 0)
-                            audio_queue.put((sentence_idx, cached, 0, label, True))
+                            audio_queue.put((sentence_idx, cached, label, True))
                             sentence_idx += 1
                             continue
 
-                        # ── TTS API ──
-                        t_tts = time.perf_counter()
-                        try:
-                            tts_url = api_tts(sentence)
-                            gen_ms = (time.perf_counter() - t_tts) * 1000
-                            log("generating", f'{label}: "{preview}"', gen_ms)
-
-                            t_dl = time.perf_counter()
-                            audio_path = download_audio(tts_url)
-                            dl_ms = (time.perf_counter() - t_dl) * 1000
-                            log("generating", f"{label}: downloaded", dl_ms)
-
-                            audio_queue.put((sentence_idx, audio_path, gen_ms, label, False))
-                        except Exception as e:
-                            gen_ms = (time.perf_counter() - t_tts) * 1000
-                            log("generating", f"{label}: ✘ FAILED — {e}", gen_ms)
-
+                        # ── TTS API (runs on the pool, LLM keeps streaming) ──
+                        future = tts_pool.submit(synthesize_sentence, sentence, label, preview)
+                        audio_queue.put((sentence_idx, future, label, False))
                         sentence_idx += 1
 
                 except Exception as e:
                     log("thinking", f"LLM stream error: {e}")
 
                 llm_stats["total_ms"] = (time.perf_counter() - t_llm_start) * 1000
+
+                # Decode smoothness: time between tokens (TBT) and
+                # time per output token after the first (TPOT)
+                token_times = token_stats.get("token_times", [])
+                if len(token_times) > 1:
+                    tbts = np.diff(token_times) * 1000
+                    llm_stats["tbt_p50_ms"] = float(np.median(tbts))
+                    llm_stats["tbt_p95_ms"] = float(np.percentile(tbts, 95))
+                    llm_stats["tpot_ms"] = float(
+                        (token_times[-1] - token_times[0]) * 1000 / (len(token_times) - 1))
                 audio_queue.put(None)  # sentinel
 
             # Start producer
@@ -570,7 +660,17 @@ def run_pipeline(args):
                 item = audio_queue.get()
                 if item is None:
                     break
-                idx, audio_path, gen_ms, label, is_cached = item
+                idx, audio, label, is_cached = item
+
+                if is_cached:
+                    audio_path = audio
+                else:
+                    # Queue order = sentence order; wait for this sentence's TTS
+                    try:
+                        audio_path = audio.result()
+                    except Exception as e:
+                        log("generating", f"{label}: ✘ FAILED — {e}")
+                        continue
 
                 if first_audio_ms is None:
                     first_audio_ms = (time.perf_counter() - t_stage) * 1000
@@ -613,6 +713,10 @@ def run_pipeline(args):
                 print(f"  LLM first sentence . {llm_stats['first_sentence_ms']:>8,.0f} ms")
             if llm_stats["total_ms"]:
                 print(f"  LLM total .......... {llm_stats['total_ms']:>8,.0f} ms")
+            if llm_stats["tpot_ms"] is not None:
+                print(f"  LLM TBT p50 / p95 .. {llm_stats['tbt_p50_ms']:>8,.1f} / "
+                      f"{llm_stats['tbt_p95_ms']:,.1f} ms")
+                print(f"  LLM TPOT ........... {llm_stats['tpot_ms']:>8,.1f} ms")
             print(f"  Gen + Play ......... {stage_total:>8,.0f} ms  (parallel)")
             if first_audio_ms is not None:
                 print(f"  ⚡ First audio at .. {total_first_audio:>8,.0f} ms  "
@@ -641,6 +745,7 @@ def run_pipeline(args):
     except KeyboardInterrupt:
         print(f"\n{Colors.BOLD}GarsonAI Optimized Pipeline stopped.{Colors.RESET}\n")
     finally:
+        tts_pool.shutdown(wait=False, cancel_futures=True)
         pa.terminate()
 
 
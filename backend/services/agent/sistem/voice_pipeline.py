@@ -23,6 +23,7 @@ import tempfile
 import threading
 import time
 import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import numpy as np
 import pyaudio
@@ -83,18 +84,13 @@ def trim_silence(frames: list, sample_rate: int, chunk_size: int,
     Remove leading/trailing silence from recorded frames.
     Keeps `padding_sec` seconds of buffer around detected speech.
     """
-    energies = [rms(f) for f in frames]
+    energies = np.fromiter((rms(f) for f in frames), dtype=np.float64, count=len(frames))
 
-    first_voice = None
-    last_voice = None
-    for i, e in enumerate(energies):
-        if e > threshold:
-            if first_voice is None:
-                first_voice = i
-            last_voice = i
-
-    if first_voice is None:
+    # One vectorized threshold pass gives both ends of the speech span
+    voiced = np.flatnonzero(energies > threshold)
+    if voiced.size == 0:
         return []  # all silence
+    first_voice, last_voice = int(voiced[0]), int(voiced[-1])
 
     padding_frames = int(padding_sec * sample_rate / chunk_size)
     start = max(0, first_voice - padding_frames)
@@ -110,7 +106,11 @@ def frames_to_wav_bytes(frames: list, sample_rate: int, channels: int) -> bytes:
         wf.setnchannels(channels)
         wf.setsampwidth(2)   # 16-bit
         wf.setframerate(sample_rate)
-        wf.writeframes(b''.join(frames))
+        # Stream frames straight into the buffer instead of joining them
+        # into one more full-size copy first; the header sizes are
+        # patched on close
+        for frame in frames:
+            wf.writeframesraw(frame)
     return buf.getvalue()
 
 
@@ -158,14 +158,29 @@ def _ext_from_url(url: str) -> str:
     return '.wav'
 
 
-def warm_phrase_cache():
+def _generate_phrase(phrase: str, key: str) -> str:
+    """TTS one phrase, download it into CACHE_DIR and return the path."""
+    tts_url = api_tts(phrase)
+    resp = requests.get(tts_url, timeout=60)
+    resp.raise_for_status()
+    cached_path = os.path.join(CACHE_DIR, f"{key}{_ext_from_url(tts_url)}")
+    with open(cached_path, 'wb') as f:
+        f.write(resp.content)
+    return cached_path
+
+
+def warm_phrase_cache(max_workers: int = 8):
     """
     Generate TTS for every COMMON_PHRASE and save to disk.
     Skips phrases already cached.  Called once at pipeline startup.
+
+    Missing phrases are generated concurrently (`max_workers` TTS calls
+    in flight), so a cold cache costs ~one TTS round-trip, not N.
     """
     os.makedirs(CACHE_DIR, exist_ok=True)
     log("caching", f"warming phrase cache ({len(COMMON_PHRASES)} phrases)...")
 
+    missing = []
     for phrase in COMMON_PHRASES:
         key = _normalize(phrase)
 
@@ -188,29 +203,59 @@ def warm_phrase_cache():
             if os.path.exists(p):
                 os.unlink(p)
 
+        missing.append((phrase, key))
+
+    if missing:
         t0 = time.perf_counter()
-        try:
-            tts_url = api_tts(phrase)
-            resp = requests.get(tts_url, timeout=60)
-            resp.raise_for_status()
-            ext = _ext_from_url(tts_url)
-            cached_path = os.path.join(CACHE_DIR, f"{key}{ext}")
-            with open(cached_path, 'wb') as f:
-                f.write(resp.content)
-            _phrase_cache[key] = cached_path
-            ms = (time.perf_counter() - t0) * 1000
-            log("caching", f'  ✓ generated ({ext}): "{phrase}"', ms)
-        except Exception as e:
-            ms = (time.perf_counter() - t0) * 1000
-            log("caching", f'  ✘ FAILED: "{phrase}" — {e}', ms)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_generate_phrase, phrase, key): (phrase, key)
+                for phrase, key in missing
+            }
+            for future in as_completed(futures):
+                phrase, key = futures[future]
+                ms = (time.perf_counter() - t0) * 1000
+                try:
+                    cached_path = future.result()
+                    _phrase_cache[key] = cached_path
+                    ext = os.path.splitext(cached_path)[1]
+                    log("caching", f'  ✓ generated ({ext}): "{phrase}"', ms)
+                except Exception as e:
+                    log("caching", f'  ✘ FAILED: "{phrase}" — {e}', ms)
 
     log("caching", f"{len(_phrase_cache)}/{len(COMMON_PHRASES)} phrases cached")
 
 
+# Courtesy words an LLM tacks onto an otherwise identical phrase
+FILLER_WORDS = frozenset({"efendim", "lütfen"})
+
+
+def _near_miss_lookup(key: str) -> str | None:
+    """
+    Near-miss fallback: same words up to whitespace, allowing one trailing
+    filler word on either side. Deliberately not fuzzy — in Turkish a
+    one-syllable edit (alıyorum / almıyorum) flips the meaning.
+    """
+    words = key.split()
+    if not words:
+        return None
+    candidates = [" ".join(words)]
+    if len(words) > 1 and words[-1] in FILLER_WORDS:
+        candidates.append(" ".join(words[:-1]))
+    candidates += [f"{candidates[0]} {w}" for w in FILLER_WORDS]
+    for candidate in candidates:
+        path = _phrase_cache.get(candidate)
+        if path:
+            return path
+    return None
+
+
 def lookup_phrase_cache(text: str) -> str | None:
     """Return cached audio path if `text` matches a common phrase."""
     key = _normalize(text)
     path = _phrase_cache.get(key)
+    if path is None:
+        path = _near_miss_lookup(key)
     if path and os.path.exists(path):
         return path
     return None
@@ -284,16 +329,26 @@ def api_tts(text: str) -> str:
 #  Text Chunking
 # ═══════════════════════════════════════════════════════════════════
 
+# { lowercased_phrase: phrase }  — prefix index built once at import
+_PHRASE_PREFIX_INDEX: dict[str, str] = {p.lower(): p for p in COMMON_PHRASES}
+
+# Distinct phrase lengths, longest first, so the longest opener wins
+_PHRASE_PREFIX_LENGTHS = sorted({len(k) for k in _PHRASE_PREFIX_INDEX}, reverse=True)
+
+
 def _split_leading_phrase(text: str) -> tuple[str | None, str]:
     """
     If `text` starts with a COMMON_PHRASE, split it off.
     Returns (phrase_or_None, remaining_text).
+
+    One dict probe per distinct phrase length instead of a
+    startswith() scan over every phrase.
     """
     lower = text.lower()
-    for phrase in sorted(COMMON_PHRASES, key=len, reverse=True):
-        if lower.startswith(phrase.lower()):
-            rest = text[len(phrase):].strip()
-            return phrase, rest
+    for n in _PHRASE_PREFIX_LENGTHS:
+        phrase = _PHRASE_PREFIX_INDEX.get(lower[:n])
+        if phrase:
+            return phrase, text[n:].strip()
     return None, text
 
 
@@ -339,6 +394,23 @@ def chunk_text(text: str) -> list:
     return chunks if chunks else [text]
 
 
+def batch_chunks(chunks: list) -> list:
+    """
+    Group chunks into TTS calls: a cached opener and the first sentence
+    stay separate so first audio arrives fast, everything after them is
+    joined into a single TTS request.
+
+    Each TTS call pays a fixed queue + model round-trip, so N sentences
+    as one request cost far less than N requests — and by the time the
+    first sentence finishes playing the batched remainder is ready.
+    """
+    lead = 1 if chunks and lookup_phrase_cache(chunks[0]) else 0
+    split = lead + 1
+    if len(chunks) <= split + 1:
+        return chunks
+    return chunks[:split] + [" ".join(chunks[split:])]
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  Audio Download & Playback
 # ═══════════════════════════════════════════════════════════════════
@@ -508,9 +580,12 @@ def run_pipeline(args):
             #  STAGE 6 — CHUNKING  (split for streaming TTS)
             # ════════════════════════════════════════════════════════
             t0 = time.perf_counter()
-            chunks = chunk_text(llm_response)
+            sentences = chunk_text(llm_response)
+            chunks = batch_chunks(sentences)
             chunk_ms = (time.perf_counter() - t0) * 1000
-            log("chunking", f"{len(chunks)} chunk(s) created", chunk_ms)
+            log("chunking",
+                f"{len(sentences)} sentence(s) → {len(chunks)} TTS call(s)",
+                chunk_ms)
 
             # ════════════════════════════════════════════════════════
             #  STAGE 7+8 — GENERATING + PLAYING  (parallel)
@@ -1,32 +1,100 @@
 import fal_client
 from core.config import get_settings
 import asyncio
+import logging
 import json
-from typing import AsyncGenerator, Dict, Any
+from typing import AsyncGenerator, Dict, Any, Optional
+from cachetools import LRUCache
 
 settings = get_settings()
+logger = logging.getLogger("llm")
 
 # Set FAL API key
 import os
 os.environ['FAL_KEY'] = settings.FAL_KEY
 
+class SpokenResponseExtractor:
+    """
+    Incremental scanner for the streamed JSON reply
+    Each call only walks the text added since the previous one, and the
+    spoken_response value is returned the moment its closing quote arrives
+    """
+    def __init__(self):
+        self._pos = 0              # chars of the response already scanned
+        self._in_string = False
+        self._escape = False
+        self._buf = []             # raw chars of the string being read
+        self._last_string = None   # last completed string (a key if ':' follows)
+        self._key = None           # key whose value comes next
+        self._capturing = False
+        self.done = False
+    
+    def feed(self, full_text: str) -> Optional[str]:
+        """Scan the new tail of full_text; the spoken text once complete, else None"""
+        if self.done:
+            return None
+        if len(full_text) < self._pos:
+            # Stream restarted with a different text; scan it from scratch
+            self.__init__()
+        
+        for ch in full_text[self._pos:]:
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._buf.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._buf.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    raw = "".join(self._buf)
+                    if self._capturing:
+                        self.done = True
+                        try:
+                            return json.loads(f'"{raw}"')
+                        except ValueError:
+                            return raw
+                    self._last_string = raw
+                else:
+                    self._buf.append(ch)
+            elif ch == '"':
+                self._in_string = True
+                self._buf = []
+                self._capturing = self._key == "spoken_response"
+                self._key = None
+            elif ch == ":":
+                self._key = self._last_string
+            elif ch in ",{[":
+                self._key = None
+                self._last_string = None
+        return None
+
 class LLMService:
     def __init__(self):
         self.model = "openrouter/router"
         self.llm_model = "google/gemini-2.5-flash"  # Stable model
         
-        # Cached menu context (shared across all requests)
-        self._cached_menu = None
-        
         # Ultra-compact system prompt (~25 tokens)
         self.system_prompt = """GarsonAI bot. Kısa yanıt (max 10 kelime).
 JSON only: {"spoken_response":"...","intent":"add|info|hi","product_name":"...","quantity":1}"""
+        
+        # Static system prompts (instructions + menu) keyed by menu text. One
+        # entry per active restaurant, so concurrent sessions for different
+        # restaurants don't evict each other's prefix
+        self._prefix_cache = LRUCache(maxsize=128)
     
-    def cache_menu(self, menu_context: str):
-        """Cache menu context to avoid sending it repeatedly"""
-        if self._cached_menu != menu_context:
-            self._cached_menu = menu_context
-            print(f"📋 LLM: Menu cached ({len(menu_context)} chars)")
+    def cache_menu(self, menu_context: str) -> str:
+        """Return the cached system prompt for a menu, building it on first use"""
+        prefix = self._prefix_cache.get(menu_context)
+        if prefix is None:
+            if menu_context:
+                prefix = f"{self.system_prompt}\n\nMenü:\n{menu_context}"
+                logger.debug("📋 LLM: Menu cached (%s chars)", len(menu_context))
+            else:
+                prefix = self.system_prompt
+            self._prefix_cache[menu_context] = prefix
+        return prefix
         
     async def generate_stream(self, user_message: str, menu_context: str = "", start_time: float = None) -> AsyncGenerator[Dict[str, Any], None]:
         """
@@ -34,41 +102,35 @@ JSON only: {"spoken_response":"...","intent":"add|info|hi","product_name":"...",
         Uses cached menu context to reduce prompt tokens
         """
         try:
-            # Cache menu if provided
-            if menu_context:
-                self.cache_menu(menu_context)
-            
-            # Build compact prompt (menu reference cached on OpenRouter side)
-            # Note: OpenRouter supports prompt caching via prompt_prefix
-            if self._cached_menu:
-                # Use cached menu reference
-                prompt = f"{self.system_prompt}\n\nMenü:\n{self._cached_menu}\n\nMüşteri: {user_message}\n\nYanıt ver (JSON formatında):"
-            else:
-                # No menu available
-                prompt = f"{self.system_prompt}\n\nMüşteri: {user_message}\n\nYanıt ver (JSON formatında):"
+            # Instructions + menu go in the system message, byte-identical for
+            # every turn at a restaurant, so the provider can reuse its cached
+            # prefix; only the short user message varies
+            system_prompt = self.cache_menu(menu_context)
+            prompt = f"Müşteri: {user_message}\n\nYanıt ver (JSON formatında):"
             
-            print(f"🤖 LLM: Generating response for: {user_message}")
-            print(f"📊 LLM: Prompt length: {len(prompt)} chars (~{len(prompt.split())} tokens)")
+            logger.debug("🤖 LLM: Generating response for: %s", user_message)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📊 LLM: Prompt length: %s chars (~%s tokens)", len(system_prompt) + len(prompt), len(system_prompt.split()) + len(prompt.split()))
             
             # Use fal.stream for streaming
             full_response = ""
             has_content = False
             
-            def sync_stream():
-                return fal_client.stream(
-                    self.model,
-                    arguments={
-                        "prompt": prompt,
-                        "model": self.llm_model,
-                        "temperature": 0.7,
-                        "max_tokens": 100  # Voice AI needs short responses
-                    }
-                )
-            
-            stream = await asyncio.to_thread(sync_stream)
+            # Async stream: the event loop keeps serving other sessions
+            # (and the parallel TTS task) between LLM events
+            stream = fal_client.stream_async(
+                self.model,
+                arguments={
+                    "prompt": prompt,
+                    "system_prompt": system_prompt,
+                    "model": self.llm_model,
+                    "temperature": 0.7,
+                    "max_tokens": 100  # Voice AI needs short responses
+                }
+            )
             
-            for event in stream:
-                print(f"📨 LLM Event: {event}")
+            async for event in stream:
+                logger.debug("📨 LLM Event: %s", event)
                 
                 if isinstance(event, dict):
                     # Check for 'output' field (full text so far)
@@ -101,23 +163,24 @@ JSON only: {"spoken_response":"...","intent":"add|info|hi","product_name":"...",
                                 "full_text": full_response
                             }
             
-            print(f"✅ LLM: Response complete: {full_response}")
+            logger.debug("✅ LLM: Response complete: %s", full_response)
             
             # If no content was streamed, fallback to non-streaming
             if not has_content:
-                print("⚠️ LLM: No streaming content, trying subscribe...")
+                logger.warning("⚠️ LLM: No streaming content, trying subscribe...")
                 result = await asyncio.to_thread(
                     fal_client.subscribe,
                     self.model,
                     arguments={
                         "prompt": prompt,
+                    "system_prompt": system_prompt,
                         "model": self.llm_model,
                         "temperature": 0.7,
                         "max_tokens": 500
                     }
                 )
                 
-                print(f"📊 LLM Subscribe result: {result}")
+                logger.debug("📊 LLM Subscribe result: %s", result)
                 
                 if isinstance(result, dict) and "output" in result:
                     full_response = result["output"]
@@ -152,7 +215,7 @@ JSON only: {"spoken_response":"...","intent":"add|info|hi","product_name":"...",
                     }
                     
                 except Exception as parse_error:
-                    print(f"⚠️ LLM: Could not parse JSON: {parse_error}")
+                    logger.warning("⚠️ LLM: Could not parse JSON: %s", parse_error)
                     yield {
                         "type": "complete",
                         "structured": {
@@ -163,7 +226,7 @@ JSON only: {"spoken_response":"...","intent":"add|info|hi","product_name":"...",
                         }
                     }
             else:
-                print("❌ LLM: Empty response!")
+                logger.error("❌ LLM: Empty response!")
                 yield {
                     "type": "complete",
                     "structured": {
@@ -175,9 +238,7 @@ JSON only: {"spoken_response":"...","intent":"add|info|hi","product_name":"...",
                 }
                 
         except Exception as e:
-            print(f"❌ LLM Error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ LLM Error: %s", e)
             yield {
                 "type": "complete",
                 "structured": {
@@ -1,14 +1,14 @@
 import fal_client
 from core.config import get_settings
 import asyncio
+import logging
 from typing import AsyncGenerator
-import tempfile
 import os
 import time
-import httpx
-import io
+from core.fal_client_pool import get_async_http_client
 
 settings = get_settings()
+logger = logging.getLogger("stt")
 
 # Set FAL API key for fal_client
 os.environ['FAL_KEY'] = settings.FAL_KEY
@@ -17,25 +17,24 @@ class STTService:
     def __init__(self):
         # Using whisper-small for better latency (2-3x faster than base)
         self.model = "freya-mypsdi253hbk/freya-stt/generate"
-        self.http_client = httpx.AsyncClient(timeout=60.0)
+        self.http_client = get_async_http_client()
         self.api_url = "https://queue.fal.run/freya-mypsdi253hbk/freya-stt/generate"
         
     async def transcribe_stream(self, audio_data: bytes, start_time: float) -> str:
         """
         Transcribe audio using Whisper - DIRECT multipart POST (CDN bypass)
         """
-        temp_file_path = None
         try:
-            t0 = time.time()
-            print(f"🎤 STT: Received {len(audio_data)} bytes")
+            t0 = time.perf_counter()
+            logger.debug("🎤 STT: Received %s bytes", len(audio_data))
             
             # 🚀 STRATEGY 1: Direct multipart/form-data POST (NO CDN UPLOAD)
             try:
-                print("⚡ STT: Using direct binary POST (CDN bypass)")
+                logger.debug("⚡ STT: Using direct binary POST (CDN bypass)")
                 
-                # Create file-like object from bytes
+                # Raw bytes go straight into the multipart body
                 files = {
-                    "audio": ("audio.webm", io.BytesIO(audio_data), "audio/webm")
+                    "audio": ("audio.webm", audio_data, "audio/webm")
                 }
                 
                 data = {
@@ -48,48 +47,44 @@ class STTService:
                     "Authorization": f"Key {settings.FAL_KEY}"
                 }
                 
-                t_request = time.time()
+                t_request = time.perf_counter()
                 response = await self.http_client.post(
                     self.api_url,
                     files=files,
                     data=data,
-                    headers=headers
+                    headers=headers,
+                    timeout=60.0
                 )
                 
-                t_response = time.time()
-                print(f"📡 STT: HTTP request took {t_response - t_request:.3f}s")
+                t_response = time.perf_counter()
+                logger.debug("📡 STT: HTTP request took %.3fs", t_response - t_request)
                 
                 if response.status_code != 200:
-                    print(f"⚠️ Direct POST failed ({response.status_code}), trying fal_client...")
+                    logger.warning("⚠️ Direct POST failed (%s), trying fal_client...", response.status_code)
                     raise Exception(f"HTTP {response.status_code}")
                 
                 result = response.json()
-                print(f"📊 STT: Got result: {result}")
+                logger.debug("📊 STT: Got result: %s", result)
                 text = self._extract_text(result)
                 
-                elapsed = time.time() - start_time
-                request_time = time.time() - t0
-                print(f"✅ [STT done]: {elapsed:06.3f}s total | {request_time:.3f}s request")
+                elapsed = time.perf_counter() - start_time
+                request_time = time.perf_counter() - t0
+                logger.info("✅ [STT done]: %06.3fs total | %.3fs request", elapsed, request_time)
                 return text
                 
             except Exception as e:
-                print(f"⚠️ Direct POST failed: {e}, falling back to fal_client...")
+                logger.warning("⚠️ Direct POST failed: %s, falling back to fal_client...", e)
                 
-                # FALLBACK: Use fal_client with file upload
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as temp_file:
-                    temp_file.write(audio_data)
-                    temp_file_path = temp_file.name
+                # FALLBACK: Use fal_client with CDN upload
+                # (bytes go straight from memory - no temp file round-trip)
+                t_upload = time.perf_counter()
+                logger.debug("⬆️ STT: Uploading to CDN...")
+                audio_url = await fal_client.upload_async(audio_data, "audio/webm")
+                upload_time = time.perf_counter() - t_upload
+                logger.debug("✅ STT: Uploaded to %s (%.3fs)", audio_url, upload_time)
                 
-                print(f"📁 STT: Created temp file {temp_file_path}")
-                
-                t_upload = time.time()
-                print("⬆️ STT: Uploading to CDN...")
-                audio_url = fal_client.upload_file(temp_file_path)
-                upload_time = time.time() - t_upload
-                print(f"✅ STT: Uploaded to {audio_url} ({upload_time:.3f}s)")
-                
-                t_inference = time.time()
-                print("🤖 STT: Calling Whisper...")
+                t_inference = time.perf_counter()
+                logger.debug("🤖 STT: Calling Whisper...")
                 result = await asyncio.to_thread(
                     fal_client.subscribe,
                     self.model,
@@ -100,38 +95,32 @@ class STTService:
                         "chunk_level": "segment"
                     }
                 )
-                inference_time = time.time() - t_inference
+                inference_time = time.perf_counter() - t_inference
                 
-                print(f"📊 STT: Got result: {result}")
+                logger.debug("📊 STT: Got result: %s", result)
                 text = self._extract_text(result)
                 
-                elapsed = time.time() - start_time
-                print(f"✅ [STT done]: {elapsed:06.3f}s total | upload: {upload_time:.3f}s | inference: {inference_time:.3f}s")
+                elapsed = time.perf_counter() - start_time
+                logger.info("✅ [STT done]: %06.3fs total | upload: %.3fs | inference: %.3fs", elapsed, upload_time, inference_time)
                 return text
             
         except Exception as e:
-            print(f"❌ STT Error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ STT Error: %s", e)
             return ""
-        finally:
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-                print(f"🗑️ STT: Cleaned up temp file")
     
     def _extract_text(self, result) -> str:
         """Extract text from Whisper result"""
         if isinstance(result, str):
-            print(f"✅ STT: Transcription successful: {result}")
+            logger.debug("✅ STT: Transcription successful: %s", result)
             return result
         elif isinstance(result, dict):
             if "text" in result:
-                print(f"✅ STT: Transcription successful: {result['text']}")
+                logger.debug("✅ STT: Transcription successful: %s", result['text'])
                 return result["text"]
             elif "chunks" in result and len(result["chunks"]) > 0:
                 text = " ".join([chunk.get("text", "") for chunk in result["chunks"]])
-                print(f"✅ STT: Transcription successful: {text}")
+                logger.debug("✅ STT: Transcription successful: %s", text)
                 return text
         
-        print(f"⚠️ STT: Unexpected result format: {result}")
+        logger.warning("⚠️ STT: Unexpected result format: %s", result)
         return ""
@@ -1,22 +1,67 @@
-import fal_client
 from core.config import get_settings
 from core.fal_client_pool import get_async_http_client
 import asyncio
+import logging
 from typing import AsyncGenerator
 import os
 import time
-import base64
+from binascii import a2b_base64
+from cachetools import LRUCache
+import orjson
 
 settings = get_settings()
+logger = logging.getLogger("tts")
 
 # Set FAL API key for fal_client
 os.environ['FAL_KEY'] = settings.FAL_KEY
 
+# Short replies ("Siparişiniz alındı", greetings) repeat constantly;
+# their PCM is cached so a repeat costs no TTS round-trip
+TTS_CACHE_MAX_TEXT = 120          # only cache texts up to this many chars
+TTS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
 class TTSService:
     def __init__(self):
         self.model = "freya-mypsdi253hbk/freya-tts"
+        self.stream_url = f"https://fal.run/{self.model}/stream"
         # Use pooled HTTP client instead of creating new one
         self.http_client = get_async_http_client()
+        # normalized text -> tuple of PCM chunks, bounded by total bytes
+        self._pcm_cache = LRUCache(
+            maxsize=TTS_CACHE_MAX_BYTES,
+            getsizeof=lambda chunks: sum(len(c) for c in chunks)
+        )
+    
+    async def _stream_events(self, text: str) -> AsyncGenerator[dict, None]:
+        """
+        POST to the fal streaming endpoint over the pooled HTTP/2 client and
+        yield the parsed SSE events. fal_client.stream_async opens a fresh
+        client (TCP + TLS handshake) for every call; this reuses the warm
+        connection across turns and sessions
+        """
+        async with self.http_client.stream(
+            "POST",
+            self.stream_url,
+            content=orjson.dumps({
+                "input": text,
+                "voice": "ali",  # Turkish voice
+                "speed": 1.15       # 15% faster for reduced latency
+            }),
+            headers={
+                "Authorization": f"Key {settings.FAL_KEY}",
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream"
+            }
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    yield orjson.loads(line[5:])
+    
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        # Whitespace-only normalization: lower() would fold Turkish I/ı
+        return " ".join(text.split())
         
     async def speak_stream(self, text: str, start_time: float = None) -> AsyncGenerator[bytes, None]:
         """
@@ -27,35 +72,41 @@ class TTSService:
         total_bytes = 0
         first_chunk_time = None
         
+        key = self._cache_key(text)
+        cacheable = len(key) <= TTS_CACHE_MAX_TEXT
+        cached = self._pcm_cache.get(key) if cacheable else None
+        if cached is not None:
+            if start_time:
+                elapsed = time.perf_counter() - start_time
+                logger.info("⚡ [TTS cache hit]: %06.3fs (%s chunks) %s", elapsed, len(cached), text[:50])
+            for pcm_bytes in cached:
+                yield pcm_bytes
+            return
+        collected = [] if cacheable else None
+        events = None
+        
         try:
-            print(f"🔊 TTS Streaming: {text[:50]}...")
-            
-            # Use streaming endpoint for real-time audio
-            stream = fal_client.stream(
-                self.model,
-                arguments={
-                    "input": text,
-                    "voice": "ali",  # Turkish voice
-                    "speed": 1.15       # 15% faster for reduced latency
-                },
-                path="/stream"  # ⚡ STREAMING MODE!
-            )
+            logger.debug("🔊 TTS Streaming: %s...", text[:50])
             
-            for event in stream:
+            # Use streaming endpoint for real-time audio (⚡ STREAMING MODE!)
+            events = self._stream_events(text)
+            async for event in events:
                 # Audio chunk received
                 if "audio" in event:
                     chunk_count += 1
                     
-                    # Decode base64 PCM data
-                    audio_b64 = event["audio"]
-                    pcm_bytes = base64.b64decode(audio_b64)
+                    # Decode base64 PCM data (a2b_base64 skips b64decode's
+                    # Python-level argument handling on every chunk)
+                    pcm_bytes = a2b_base64(event["audio"])
                     
                     total_bytes += len(pcm_bytes)
+                    if collected is not None:
+                        collected.append(pcm_bytes)
                     
                     # Log first chunk timing
                     if chunk_count == 1 and start_time:
-                        first_chunk_time = time.time() - start_time
-                        print(f"⚡ [First TTS chunk]: {first_chunk_time:06.3f}s (chunk size: {len(pcm_bytes)} bytes)")
+                        first_chunk_time = time.perf_counter() - start_time
+                        logger.info("⚡ [First TTS chunk]: %06.3fs (chunk size: %s bytes)", first_chunk_time, len(pcm_bytes))
                     
                     # Yield immediately to WebSocket
                     yield pcm_bytes
@@ -64,10 +115,10 @@ class TTSService:
                 if "error" in event:
                     error = event["error"]
                     if not event.get("recoverable", False):
-                        print(f"❌ TTS error: {error}")
+                        logger.error("❌ TTS error: %s", error)
                         raise RuntimeError(f"TTS error: {error}")
                     else:
-                        print(f"⚠️ TTS recoverable error: {error}")
+                        logger.warning("⚠️ TTS recoverable error: %s", error)
                 
                 # Stream complete
                 if event.get("done"):
@@ -77,13 +128,20 @@ class TTSService:
                     }
                     
                     if start_time:
-                        elapsed = time.time() - start_time
-                        print(f"✅ TTS Streaming complete: {chunk_count} chunks, {total_bytes} bytes, {elapsed:06.3f}s total")
-                        print(f"   Metadata: {metadata}")
+                        elapsed = time.perf_counter() - start_time
+                        logger.debug("✅ TTS Streaming complete: %s chunks, %s bytes, %06.3fs total", chunk_count, total_bytes, elapsed)
+                        logger.debug("   Metadata: %s", metadata)
+                    
+                    # Only complete streams are cached
+                    if collected:
+                        self._pcm_cache[key] = tuple(collected)
                     break
             
         except Exception as e:
-            print(f"❌ TTS Streaming error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ TTS Streaming error: %s", e)
             raise
+        finally:
+            # Release the pooled connection now (after "done", errors or a
+            # cancelled turn) rather than whenever the generator is collected
+            if events is not None:
+                await events.aclose()
@@ -26,6 +26,9 @@ class TTSWarmer:
         self.stt_model = "freya-mypsdi253hbk/freya-stt/generate"
         self.is_running = False
         self.task = None
+        # Set by stop() so the run loop wakes immediately instead of
+        # finishing its current sleep
+        self._stop_event = asyncio.Event()
         
     async def warmup_tts(self):
         """
@@ -87,22 +90,25 @@ class TTSWarmer:
         self.is_running = True
         print(f"🚀 Container Warmer: Started (interval: {self.interval}s)")
         
-        while self.is_running:
-            await asyncio.sleep(self.interval)
-            
-            if self.is_running:  # Check again after sleep
-                # Warm both containers in parallel
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                # Interval elapsed without a stop - warm both containers in parallel
                 await asyncio.gather(
                     self.warmup_tts(),
                     self.warmup_stt(),
                     return_exceptions=True
                 )
+        
+        self.is_running = False
     
     def start(self):
         """
         Start the warmer background task
         """
         if not self.task or self.task.done():
+            self._stop_event.clear()
             self.task = asyncio.create_task(self.run())
             print("✅ Container Warmer: Background task started (TTS + STT)")
     
@@ -111,6 +117,7 @@ class TTSWarmer:
         Stop the warmer background task
         """
         self.is_running = False
+        self._stop_event.set()
         if self.task:
             self.task.cancel()
         print("🛑 Container Warmer: Stopped")
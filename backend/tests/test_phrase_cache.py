@@ -0,0 +1,60 @@
+"""Phrase cache lookup must only hit on the same words, never on near-miss spellings"""
+
+import importlib.util
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+SISTEM_DIR = os.path.join(os.path.dirname(__file__), "..", "services", "agent", "sistem")
+
+
+# Audio/API stack both scripts import at module level; the lookup under
+# test never touches it, so stand-ins keep the tests runnable without
+# pyaudio/numpy (not backend requirements) or network clients
+STUBBED_MODULES = ("numpy", "pyaudio", "requests", "fal_client", "dotenv", "httpx")
+
+
+def _load(name, monkeypatch):
+    for dep in STUBBED_MODULES:
+        monkeypatch.setitem(sys.modules, dep, MagicMock())
+    spec = importlib.util.spec_from_file_location(
+        f"sistem_{name}", os.path.join(SISTEM_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(params=["voice_pipeline", "optimize"])
+def pipeline(request, tmp_path, monkeypatch):
+    module = _load(request.param, monkeypatch)
+    cache = {}
+    for phrase in ("Tamamdır, hemen not alıyorum.", "Merhaba, hoş geldiniz efendim."):
+        key = module._normalize(phrase)
+        path = tmp_path / f"{key}.wav"
+        path.write_bytes(b"RIFF")
+        cache[key] = str(path)
+    monkeypatch.setattr(module, "_phrase_cache", cache)
+    return module
+
+
+def test_exact_phrase_hits(pipeline):
+    assert pipeline.lookup_phrase_cache("Tamamdır, hemen not alıyorum.")
+
+
+def test_negated_phrase_misses(pipeline):
+    assert pipeline.lookup_phrase_cache("Tamamdır, hemen not almıyorum.") is None
+
+
+def test_extra_whitespace_hits(pipeline):
+    assert pipeline.lookup_phrase_cache("Tamamdır,  hemen   not alıyorum.")
+
+
+def test_trailing_filler_hits_either_way(pipeline):
+    assert pipeline.lookup_phrase_cache("Tamamdır, hemen not alıyorum efendim.")
+    assert pipeline.lookup_phrase_cache("Merhaba, hoş geldiniz.")
+
+
+def test_changed_word_misses(pipeline):
+    assert pipeline.lookup_phrase_cache("Merhaba, hoş bulduk efendim.") is None
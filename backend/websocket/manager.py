@@ -1,6 +1,7 @@
 from fastapi import WebSocket
-from typing import Dict, Set
-import json
+from typing import Dict, Set, Tuple, Hashable
+import asyncio
+import orjson
 
 class ConnectionManager:
     def __init__(self):
@@ -8,6 +9,10 @@ class ConnectionManager:
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         # Store restaurant connections for order updates
         self.restaurant_connections: Dict[int, Set[WebSocket]] = {}
+        # Outgoing notification queues + their drain tasks, keyed by
+        # ("table", table_id) / ("restaurant", restaurant_id)
+        self._queues: Dict[Tuple[str, Hashable], asyncio.Queue] = {}
+        self._drainers: Dict[Tuple[str, Hashable], asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket, table_id: str):
         await websocket.accept()
@@ -26,27 +31,56 @@ class ConnectionManager:
             self.active_connections[table_id].discard(websocket)
             if not self.active_connections[table_id]:
                 del self.active_connections[table_id]
+                self._stop_drainer(("table", table_id))
     
     def disconnect_restaurant(self, websocket: WebSocket, restaurant_id: int):
         if restaurant_id in self.restaurant_connections:
             self.restaurant_connections[restaurant_id].discard(websocket)
             if not self.restaurant_connections[restaurant_id]:
                 del self.restaurant_connections[restaurant_id]
+                self._stop_drainer(("restaurant", restaurant_id))
     
-    async def send_to_table(self, table_id: str, message: dict):
-        if table_id in self.active_connections:
-            for connection in self.active_connections[table_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
+    def send_to_table(self, table_id: str, message: dict):
+        """Queue a notification for a table (returns immediately)"""
+        self._enqueue(("table", table_id), self.active_connections, message)
     
-    async def send_to_restaurant(self, restaurant_id: int, message: dict):
-        if restaurant_id in self.restaurant_connections:
-            for connection in self.restaurant_connections[restaurant_id]:
+    def send_to_restaurant(self, restaurant_id: int, message: dict):
+        """Queue a notification for a restaurant (returns immediately)"""
+        self._enqueue(("restaurant", restaurant_id), self.restaurant_connections, message)
+    
+    def _enqueue(self, key, registry: Dict, message: dict):
+        # Must be called from the event loop (async route / handler)
+        if key[1] not in registry:
+            return
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._drainers[key] = asyncio.create_task(self._drain(key, registry, queue))
+        queue.put_nowait(message)
+    
+    async def _drain(self, key, registry: Dict, queue: asyncio.Queue):
+        """
+        Fan queued messages out to the key's sockets. Messages that pile up
+        while a send is in flight go out together as one "batch" frame.
+        """
+        while True:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+
+            message = batch[0] if len(batch) == 1 else {"type": "batch", "events": batch}
+            # Encode once per broadcast, not once per connection
+            payload = orjson.dumps(message).decode()
+            for connection in list(registry.get(key[1], ())):
                 try:
-                    await connection.send_json(message)
+                    await connection.send_text(payload)
                 except:
                     pass
+    
+    def _stop_drainer(self, key):
+        self._queues.pop(key, None)
+        task = self._drainers.pop(key, None)
+        if task:
+            task.cancel()
 
 manager = ConnectionManager()
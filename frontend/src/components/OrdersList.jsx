@@ -1,6 +1,11 @@
 import OrderCard from "./OrderCard";
 
-export default function OrdersList({ orders, onUpdateStatus }) {
+export default function OrdersList({
+  orders,
+  onUpdateStatus,
+  hasMore,
+  onLoadMore,
+}) {
   return (
     <div className="space-y-4">
       {orders.map((order) => (
@@ -14,6 +19,14 @@ export default function OrdersList({ orders, onUpdateStatus }) {
       {orders.length === 0 && (
         <div className="text-center opacity-50 py-8">No orders yet</div>
       )}
+
+      {hasMore && (
+        <div className="text-center">
+          <button className="btn btn-ghost btn-sm" onClick={onLoadMore}>
+            Load older orders
+          </button>
+        </div>
+      )}
     </div>
   );
 }
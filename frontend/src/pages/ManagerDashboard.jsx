@@ -5,11 +5,15 @@ import TablesList from "../components/TablesList";
 import ProductsList from "../components/ProductsList";
 import OrdersList from "../components/OrdersList";
 
+// Orders arrive newest first, one page at a time (matches the API default)
+const ORDERS_PAGE_SIZE = 50;
+
 export default function ManagerDashboard({ onLogout }) {
   const [activeTab, setActiveTab] = useState("tables");
   const [tables, setTables] = useState([]);
   const [products, setProducts] = useState([]);
   const [orders, setOrders] = useState([]);
+  const [hasMoreOrders, setHasMoreOrders] = useState(false);
 
   const token = localStorage.getItem("token");
   const restaurantName = localStorage.getItem("restaurantName");
@@ -48,20 +52,32 @@ export default function ManagerDashboard({ onLogout }) {
     }
   };
 
-  const fetchOrders = async () => {
-    const res = await fetch("http://localhost:8000/api/restaurant/orders", {
-      headers: { Authorization: `Bearer ${token}` },
-    });
+  const fetchOrders = async (offset = 0) => {
+    const res = await fetch(
+      `http://localhost:8000/api/restaurant/orders?limit=${ORDERS_PAGE_SIZE}&offset=${offset}`,
+      {
+        headers: { Authorization: `Bearer ${token}` },
+      },
+    );
     if (res.status === 401) {
       onLogout();
       return;
     }
     if (res.ok) {
       const data = await res.json();
-      setOrders(data);
+      // Offset 0 loads the newest page; later pages append older orders,
+      // skipping any that shifted over from the previous page
+      setOrders((prev) => {
+        if (offset === 0) return data;
+        const seen = new Set(prev.map((order) => order.id));
+        return [...prev, ...data.filter((order) => !seen.has(order.id))];
+      });
+      setHasMoreOrders(data.length === ORDERS_PAGE_SIZE);
     }
   };
 
+  const loadMoreOrders = () => fetchOrders(orders.length);
+
   const createTable = async (tableNumber) => {
     const res = await fetch("http://localhost:8000/api/restaurant/tables", {
       method: "POST",
@@ -148,7 +164,12 @@ export default function ManagerDashboard({ onLogout }) {
     );
 
     if (res.ok) {
-      fetchOrders();
+      // Update in place so older pages already loaded stay on screen
+      setOrders((prev) =>
+        prev.map((order) =>
+          order.id === orderId ? { ...order, status: newStatus } : order,
+        ),
+      );
     }
   };
 
@@ -176,7 +197,12 @@ export default function ManagerDashboard({ onLogout }) {
         )}
 
         {activeTab === "orders" && (
-          <OrdersList orders={orders} onUpdateStatus={updateOrderStatus} />
+          <OrdersList
+            orders={orders}
+            onUpdateStatus={updateOrderStatus}
+            hasMore={hasMoreOrders}
+            onLoadMore={loadMoreOrders}
+          />
         )}
       </div>
     </div>
@@ -28,6 +28,7 @@ export default function VoiceAI() {
   const compressorRef = useRef(new AudioCompressor());
   const trimmerRef = useRef(new AudioTrimmer({ silenceThreshold: 0.01, silencePaddingMs: 100 }));
   const streamingPlayerRef = useRef(new StreamingAudioPlayer());
+  const aiTextRef = useRef("");
 
   useEffect(() => {
     return () => {
@@ -55,33 +56,21 @@ export default function VoiceAI() {
       setStatus("connected");
     };
 
-    ws.onmessage = async (event) => {
-      // Handle binary audio chunks - STREAMING PCM16 from TTS
-      if (event.data instanceof Blob) {
-        const arrayBuffer = await event.data.arrayBuffer();
-
-        // Add PCM chunk to streaming player (plays immediately)
-        await streamingPlayerRef.current.addPCMChunk(arrayBuffer);
-
-        console.log(`🎵 TTS chunk received: ${arrayBuffer.byteLength} bytes`);
-        return;
-      }
-
-      // Handle JSON messages
-      const data = JSON.parse(event.data);
-      console.log("WS message:", data);
-
+    const handleMessage = (data) => {
       switch (data.type) {
         case "status":
           setStatus(data.message);
           break;
         case "transcript":
           setTranscript(data.text);
+          // New turn: start accumulating a fresh AI reply
+          aiTextRef.current = "";
           break;
-        case "ai_token":
-          // Parse JSON and extract spoken_response
+        case "ai_token": {
+          // Tokens arrive as deltas; accumulate, then extract spoken_response
+          aiTextRef.current += data.token;
+          const fullText = aiTextRef.current;
           try {
-            const fullText = data.full_text;
             if (fullText.includes("{") && fullText.includes("}")) {
               const jsonStart = fullText.indexOf("{");
               const jsonEnd = fullText.lastIndexOf("}") + 1;
@@ -92,9 +81,10 @@ export default function VoiceAI() {
               setAiResponse(fullText);
             }
           } catch (e) {
-            setAiResponse(data.full_text);
+            setAiResponse(fullText);
           }
           break;
+        }
         case "ai_complete":
           console.log("AI complete:", data.data);
           break;
@@ -117,6 +107,28 @@ export default function VoiceAI() {
       }
     };
 
+    ws.onmessage = async (event) => {
+      // Handle binary audio chunks - STREAMING PCM16 from TTS
+      if (event.data instanceof Blob) {
+        const arrayBuffer = await event.data.arrayBuffer();
+
+        // Add PCM chunk to streaming player (plays immediately)
+        await streamingPlayerRef.current.addPCMChunk(arrayBuffer);
+
+        console.log(`🎵 TTS chunk received: ${arrayBuffer.byteLength} bytes`);
+        return;
+      }
+
+      // Handle JSON messages
+      const data = JSON.parse(event.data);
+      console.log("WS message:", data);
+
+      // Queued notifications that pile up server-side arrive together
+      // as one { type: "batch", events: [...] } frame
+      const messages = data.type === "batch" ? data.events : [data];
+      messages.forEach(handleMessage);
+    };
+
     ws.onerror = (error) => {
       console.error("WebSocket error:", error);
       setStatus("error");
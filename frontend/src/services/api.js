@@ -49,10 +49,13 @@ export const api = {
     return res.json();
   },
 
-  getOrders: async (token) => {
-    const res = await fetch(`${API_BASE}/api/restaurant/orders`, {
-      headers: { Authorization: `Bearer ${token}` },
-    });
+  getOrders: async (token, limit = 50, offset = 0) => {
+    const res = await fetch(
+      `${API_BASE}/api/restaurant/orders?limit=${limit}&offset=${offset}`,
+      {
+        headers: { Authorization: `Bearer ${token}` },
+      },
+    );
     return res.json();
   },
 